@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+"""
+Preprocessing benchmark for OBS Complete Assistant.
+Compares preprocessing orderings (denoise after / before upscaling, NL-means / bilateral)
+on captured samples: preprocessing time and OCR accuracy.
+
+Samples are the original_* images saved with the "Сохранять отладочные изображения"
+setting (debug_images/).
+If a sample has a <name>.txt file next to it, accuracy is measured against that text;
+otherwise each variant is compared with the current default ordering.
+
+Usage:
+    python benchmark_preprocessing.py [samples_dir] [--scale 3] [--hq] [--adaptive] [--repeat 3]
+"""
+
+import argparse
+import statistics
+import sys
+import time
+from difflib import SequenceMatcher
+from pathlib import Path
+
+import cv2
+
+from obs_assistant import OCRResult, PreprocessingPipeline
+
+try:
+    import pytesseract
+    pytesseract.get_tesseract_version()
+except Exception:
+    pytesseract = None
+
+VARIANTS = [
+    ("upscale → nlmeans (default)", dict(denoise_first=False, denoise_method='nlmeans')),
+    ("nlmeans → upscale", dict(denoise_first=True, denoise_method='nlmeans')),
+    ("upscale → bilateral", dict(denoise_first=False, denoise_method='bilateral')),
+    ("bilateral → upscale", dict(denoise_first=True, denoise_method='bilateral')),
+]
+
+
+IMAGE_SUFFIXES = ('.png', '.jpg', '.jpeg', '.webp')
+
+
+def find_samples(samples_dir):
+    """Captured originals; fall back to every image in the directory"""
+    samples = sorted(path for path in samples_dir.glob("original_*") if path.suffix.lower() in IMAGE_SUFFIXES)
+    if not samples:
+        samples = sorted(path for path in samples_dir.iterdir() if path.suffix.lower() in IMAGE_SUFFIXES)
+    return samples
+
+
+def recognize(image, language):
+    """Text and mean confidence of a single PSM 6 pass"""
+    data = pytesseract.image_to_data(image, lang=language, config='--oem 3 --psm 6',
+                                     output_type=pytesseract.Output.DICT)
+    result = OCRResult.from_tesseract_data(data, 6)
+    return result.text, result.confidence
+
+
+def similarity(first, second):
+    """Character-level similarity of two texts, whitespace-normalized"""
+    return SequenceMatcher(None, ' '.join(first.split()), ' '.join(second.split())).ratio()
+
+
+def benchmark(samples, args):
+    stats = {name: {'ms': [], 'accuracy': [], 'confidence': []} for name, _ in VARIANTS}
+    for path in samples:
+        image = cv2.imread(str(path))
+        if image is None:
+            print(f"⚠️ Skipping unreadable sample {path.name}")
+            continue
+        truth_path = path.with_suffix('.txt')
+        truth = truth_path.read_text(encoding='utf-8') if truth_path.exists() else None
+        reference = None
+
+        for name, options in VARIANTS:
+            pipeline = PreprocessingPipeline(scale_factor=args.scale, high_quality=args.hq,
+                                             adaptive=args.adaptive, **options)
+            timings = []
+            for _ in range(args.repeat):
+                started = time.perf_counter()
+                processed = pipeline.run(image)
+                timings.append((time.perf_counter() - started) * 1000)
+            stats[name]['ms'].append(statistics.median(timings))
+
+            if pytesseract is None:
+                continue
+            text, confidence = recognize(processed, args.lang)
+            stats[name]['confidence'].append(confidence)
+            if truth is not None:
+                stats[name]['accuracy'].append(similarity(text, truth))
+            elif reference is None:
+                # The first variant (current ordering) is the reference for the others
+                reference = text
+                stats[name]['accuracy'].append(1.0)
+            else:
+                stats[name]['accuracy'].append(similarity(text, reference))
+    return stats
+
+
+def print_report(stats, sample_count):
+    print(f"\n📊 {sample_count} samples")
+    print(f"{'variant':<30} {'median ms':>10} {'total ms':>10} {'accuracy':>9} {'conf':>6}")
+    print("-" * 69)
+    for name, _ in VARIANTS:
+        row = stats[name]
+        if not row['ms']:
+            continue
+        accuracy = f"{statistics.mean(row['accuracy']) * 100:.1f}%" if row['accuracy'] else "n/a"
+        confidence = f"{statistics.mean(row['confidence']):.1f}" if row['confidence'] else "n/a"
+        print(f"{name:<30} {statistics.median(row['ms']):>10.1f} {sum(row['ms']):>10.1f} "
+              f"{accuracy:>9} {confidence:>6}")
+    if pytesseract is None:
+        print("\n⚠️ Tesseract not found - only preprocessing time was measured")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare OCR preprocessing orderings on captured samples")
+    parser.add_argument("samples_dir", nargs="?", default="debug_images", help="directory with captured samples")
+    parser.add_argument("--scale", type=int, default=3, help="scale factor (as in settings)")
+    parser.add_argument("--hq", action="store_true", help="high quality mode")
+    parser.add_argument("--adaptive", action="store_true", help="skip stages by image quality (as in the app)")
+    parser.add_argument("--repeat", type=int, default=3, help="timing runs per sample")
+    parser.add_argument("--lang", default="eng", help="Tesseract language")
+    args = parser.parse_args()
+
+    samples_dir = Path(args.samples_dir)
+    if not samples_dir.is_dir():
+        print(f"❌ Samples directory not found: {samples_dir}")
+        print("Enable \"Сохранять отладочные изображения\" in settings and run OCR on a few selections first.")
+        sys.exit(1)
+    samples = find_samples(samples_dir)
+    if not samples:
+        print(f"❌ No images in {samples_dir}")
+        sys.exit(1)
+
+    print_report(benchmark(samples, args), len(samples))
+
+
+if __name__ == "__main__":
+    main()
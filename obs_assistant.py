@@ -7,7 +7,7 @@ from PyQt5.QtWidgets import (QApplication, QMainWindow, QWidget, QVBoxLayout, QP
                            QSplitter, QDialog, QDialogButtonBox, QFormLayout, QScrollArea,
                            QProgressBar, QMessageBox, QFileDialog, QMenuBar, QAction,
                            QSystemTrayIcon, QMenu, QShortcut, QToolTip, QDockWidget,
-                           QDesktopWidget, QFrame)
+                           QDesktopWidget, QFrame, QSlider)
 from PyQt5.QtCore import Qt, QTimer, QRectF, QPointF, pyqtSignal, QThread, pyqtSlot, QSettings, QRect
 from PyQt5.QtGui import QImage, QPixmap, QPainter, QPen, QColor, QFont, QKeySequence, QIcon
 import pytesseract
@@ -18,6 +18,8 @@ from dotenv import load_dotenv
 from openai import OpenAI
 from datetime import datetime
 import json
+import time
+import queue
 import sounddevice as sd
 import tempfile
 import requests
@@ -25,7 +27,31 @@ import wave
 import re
 import logging
 import traceback
+import hashlib
+import bisect
+import threading
+import multiprocessing
+from collections import OrderedDict, deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, FIRST_COMPLETED, as_completed, wait
+from contextlib import contextmanager
+from abc import ABC, abstractmethod
 from pathlib import Path
+import importlib.util
+
+# tesserocr загружается лениво: процессы OCR пула должны ограничить потоки OpenMP
+# до загрузки libtesseract (OMP_THREAD_LIMIT читается один раз при загрузке библиотеки)
+tesserocr = None
+tesserocr_available = importlib.util.find_spec('tesserocr') is not None
+# PyAV (необязательный): индекс перемотки по меткам пакетов контейнера без декодирования кадров
+av_available = importlib.util.find_spec('av') is not None
+
+
+def load_tesserocr():
+    global tesserocr
+    if tesserocr is None:
+        import tesserocr as module
+        tesserocr = module
+    return tesserocr
 
 
 class FloatingResponseWindow(QMainWindow):
@@ -405,24 +431,1458 @@ class StatusWidget(QWidget):
         self.progress_bar.setVisible(False)
 
 
+class OCRResult:
+    """Результат одного прохода Tesseract: слова, структура строк/блоков и достоверность"""
+    def __init__(self, words, psm=None):
+        # Каждое слово: text, conf, left, top, width, height, block, par, line
+        self.words = words
+        self.psm = psm
+
+    @classmethod
+    def from_tesseract_data(cls, data, psm=None):
+        """Собирает результат из вывода pytesseract.image_to_data (Output.DICT)"""
+        words = []
+        for i, text in enumerate(data['text']):
+            text = str(text).strip()
+            if not text:
+                continue
+            words.append({
+                'text': text,
+                'conf': float(data['conf'][i]),
+                'left': int(data['left'][i]),
+                'top': int(data['top'][i]),
+                'width': int(data['width'][i]),
+                'height': int(data['height'][i]),
+                'block': int(data['block_num'][i]),
+                'par': int(data['par_num'][i]),
+                'line': int(data['line_num'][i]),
+            })
+        return cls(words, psm)
+
+    @property
+    def lines(self):
+        """Слова, сгруппированные по строкам в порядке чтения Tesseract"""
+        lines = []
+        current_key = None
+        for word in self.words:
+            key = (word['block'], word['par'], word['line'])
+            if key != current_key:
+                lines.append((key, []))
+                current_key = key
+            lines[-1][1].append(word)
+        return lines
+
+    @property
+    def text(self):
+        """Текст в формате image_to_string: строки через \\n, абзацы через пустую строку"""
+        output = []
+        previous_par = None
+        for (block, par, _), words in self.lines:
+            if previous_par is not None and (block, par) != previous_par:
+                output.append("")
+            output.append(' '.join(word['text'] for word in words))
+            previous_par = (block, par)
+        return '\n'.join(output).strip()
+
+    @property
+    def confidence(self):
+        """Средняя достоверность распознанных слов"""
+        confidences = [word['conf'] for word in self.words if word['conf'] > 0]
+        return sum(confidences) / len(confidences) if confidences else 0
+
+    @classmethod
+    def merge(cls, results, as_lines=False):
+        """Склеивает результаты нескольких блоков в порядке чтения (блоки перенумеровываются)
+
+        as_lines: результаты - строки одного текста, склеиваются в один абзац
+        """
+        words = []
+        block_numbers = {}
+        line_numbers = {}
+        for index, result in enumerate(results):
+            for word in result.words:
+                if as_lines:
+                    key = (index, word['block'], word['par'], word['line'])
+                    if key not in line_numbers:
+                        line_numbers[key] = len(line_numbers) + 1
+                    words.append(dict(word, block=1, par=1, line=line_numbers[key]))
+                    continue
+                key = (index, word['block'])
+                if key not in block_numbers:
+                    block_numbers[key] = len(block_numbers) + 1
+                words.append(dict(word, block=block_numbers[key]))
+        return cls(words)
+
+    @staticmethod
+    def box_iou(first, second):
+        """Пересечение над объединением рамок двух слов"""
+        width = min(first['left'] + first['width'], second['left'] + second['width']) - max(first['left'], second['left'])
+        height = min(first['top'] + first['height'], second['top'] + second['height']) - max(first['top'], second['top'])
+        if width <= 0 or height <= 0:
+            return 0.0
+        intersection = width * height
+        union = first['width'] * first['height'] + second['width'] * second['height'] - intersection
+        return intersection / union if union > 0 else 0.0
+
+    @classmethod
+    def vote(cls, results, min_iou=0.5, min_extra_confidence=80):
+        """Пословное голосование вариантов одного изображения: у каждого слова - самое достоверное прочтение
+
+        Раскладка (строки, рамки) берется у самого достоверного варианта; слова, которых в нем нет,
+        добавляются из других вариантов при достоверности не ниже min_extra_confidence.
+        Возвращает (результат, сколько слов заменено или добавлено).
+        """
+        results = [result for result in results if result is not None and result.words]
+        if not results:
+            return cls([]), 0
+        anchor = max(results, key=lambda result: result.confidence)
+        words = [dict(word) for word in anchor.words]
+        boxes = [dict(word) for word in anchor.words]  # Рамки опорного варианта для сопоставления
+        changed = 0
+        for result in results:
+            if result is anchor:
+                continue
+            for word in result.words:
+                overlaps = [(cls.box_iou(word, box), index) for index, box in enumerate(boxes)]
+                iou, index = max(overlaps) if overlaps else (0.0, None)
+                if iou >= min_iou:
+                    if word['conf'] > words[index]['conf']:
+                        if word['text'] != words[index]['text']:
+                            changed += 1
+                        words[index].update(text=word['text'], conf=word['conf'])
+                    continue
+                if word['conf'] < min_extra_confidence or any(iou > 0 for iou, _ in overlaps):
+                    continue
+                # Пропущенное опорным вариантом слово - в строку, с которой оно совпадает по высоте
+                center = word['top'] + word['height'] / 2
+                line = next((box for box in boxes if box['top'] <= center <= box['top'] + box['height']), None)
+                if line is None:
+                    continue
+                words.append(dict(word, block=line['block'], par=line['par'], line=line['line']))
+                boxes.append(words[-1])
+                changed += 1
+
+        # Порядок строк - как у опорного варианта, слова в строке - слева направо
+        line_order = {}
+        for word in words:
+            line_order.setdefault((word['block'], word['par'], word['line']), len(line_order))
+        words.sort(key=lambda word: (line_order[(word['block'], word['par'], word['line'])], word['left']))
+        return cls(words), changed
+
+
+class OCRBlock:
+    """Фрагмент области для отдельного прохода OCR"""
+    def __init__(self, image, psm, bbox):
+        self.image = image  # PIL изображение после предобработки
+        self.psm = psm
+        self.bbox = bbox  # (x, y, w, h) в координатах исходной области
+        self.result = None
+        self.signature = None  # Подпись строки для инкрементального OCR
+
+
+class TextRegionDetector:
+    """Быстрый поиск текстовых строк и блоков внутри выделения (морфологический градиент)"""
+    min_roi_area = 150000  # Меньшие области выгоднее распознавать целиком
+    max_blocks = 24
+    max_coverage = 0.85  # Если блоки покрывают почти всю область, выигрыша нет
+    padding = 6
+
+    def detect_lines(self, image):
+        """Прямоугольники текстовых строк (x, y, w, h)"""
+        gray = to_gray(image)
+        height, width = gray.shape
+        gradient = cv2.morphologyEx(gray, cv2.MORPH_GRADIENT, cv2.getStructuringElement(cv2.MORPH_ELLIPSE, (3, 3)))
+        _, binary = cv2.threshold(gradient, 0, 255, cv2.THRESH_BINARY | cv2.THRESH_OTSU)
+        
+        # Склеиваем символы и слова одной строки по горизонтали
+        join_width = max(9, width // 50)
+        connected = cv2.morphologyEx(binary, cv2.MORPH_CLOSE, cv2.getStructuringElement(cv2.MORPH_RECT, (join_width, 1)))
+        contours, _ = cv2.findContours(connected, cv2.RETR_LIST, cv2.CHAIN_APPROX_SIMPLE)
+        
+        rects = []
+        for contour in contours:
+            x, y, w, h = cv2.boundingRect(contour)
+            if w < 8 or h < 6:
+                continue
+            # Рамки и линии интерфейса почти пустые внутри
+            if cv2.countNonZero(binary[y:y + h, x:x + w]) < 0.1 * w * h:
+                continue
+            rects.append((x, y, w, h))
+            
+        # Убираем вложенные прямоугольники (дырки букв, содержимое рамок)
+        lines = []
+        for rect in sorted(rects, key=lambda r: r[2] * r[3], reverse=True):
+            x, y, w, h = rect
+            if not any(ox <= x and oy <= y and x + w <= ox + ow and y + h <= oy + oh for ox, oy, ow, oh in lines):
+                lines.append(rect)
+        return sorted(lines, key=lambda r: (r[1], r[0]))
+
+    def group_blocks(self, lines):
+        """Объединяет соседние строки с общим горизонтальным диапазоном в блоки"""
+        blocks = []  # [x1, y1, x2, y2, line_count]
+        for x, y, w, h in lines:
+            for block in blocks:
+                overlap = min(block[2], x + w) - max(block[0], x)
+                gap = y - block[3]
+                if overlap > 0.3 * min(w, block[2] - block[0]) and -h < gap < 1.2 * h:
+                    block[0], block[1] = min(block[0], x), min(block[1], y)
+                    block[2], block[3] = max(block[2], x + w), max(block[3], y + h)
+                    block[4] += 1
+                    break
+            else:
+                blocks.append([x, y, x + w, y + h, 1])
+        return self.merge_overlapping(blocks)
+
+    def merge_overlapping(self, blocks):
+        """Сливает пересекшиеся или вложенные блоки (с отступами) - общая часть не распознается дважды"""
+        margin = 2 * self.padding
+        merged = True
+        while merged:
+            merged = False
+            for i, first in enumerate(blocks):
+                for second in blocks[i + 1:]:
+                    if first[0] < second[2] + margin and second[0] < first[2] + margin and \
+                            first[1] < second[3] + margin and second[1] < first[3] + margin:
+                        first[0], first[1] = min(first[0], second[0]), min(first[1], second[1])
+                        first[2], first[3] = max(first[2], second[2]), max(first[3], second[3])
+                        first[4] += second[4]
+                        blocks.remove(second)
+                        merged = True
+                        break
+                if merged:
+                    break
+        return blocks
+
+    def reading_order(self, blocks):
+        """Сверху вниз, а в пределах одной полосы - слева направо"""
+        ordered = []
+        remaining = sorted(blocks, key=lambda b: b[1])
+        while remaining:
+            first = remaining[0]
+            row = [b for b in remaining if b[1] < first[1] + first[3]]
+            remaining = [b for b in remaining if b not in row]
+            ordered.extend(sorted(row, key=lambda b: b[0]))
+        return ordered
+
+    def detect(self, image):
+        """Текстовые блоки (x, y, w, h, line_count) в порядке чтения; [] - распознавать целиком"""
+        height, width = image.shape[:2]
+        lines = self.detect_lines(image)
+        if not lines:
+            return []
+            
+        regions = []
+        for x1, y1, x2, y2, line_count in self.group_blocks(lines):
+            x1, y1 = max(0, x1 - self.padding), max(0, y1 - self.padding)
+            x2, y2 = min(width, x2 + self.padding), min(height, y2 + self.padding)
+            regions.append((x1, y1, x2 - x1, y2 - y1, line_count))
+            
+        covered = sum(w * h for _, _, w, h, _ in regions)
+        if len(regions) > self.max_blocks or covered > self.max_coverage * width * height:
+            return []
+        return self.reading_order(regions)
+
+
+class PytesseractEngine:
+    """OCR движок на pytesseract: отдельный процесс tesseract на каждый вызов"""
+    in_process = False
+
+    def __init__(self, language, psm):
+        self.language = language
+        self.psm = psm
+        self.config = f'--oem 3 --psm {psm}'
+
+    def recognize(self, image):
+        data = pytesseract.image_to_data(image, lang=self.language, config=self.config,
+                                         output_type=pytesseract.Output.DICT)
+        return OCRResult.from_tesseract_data(data, self.psm)
+
+    def close(self):
+        pass
+
+
+class TesserocrEngine:
+    """OCR движок tesserocr: языковая модель загружается один раз и остается в памяти"""
+    in_process = True
+
+    def __init__(self, language, psm):
+        self.language = language
+        self.psm = psm
+        load_tesserocr()
+        self.api = tesserocr.PyTessBaseAPI(lang=language, psm=psm, oem=tesserocr.OEM.DEFAULT)
+
+    def recognize(self, image):
+        words = []
+        try:
+            self.api.SetImage(image)
+            self.api.Recognize()
+            iterator = self.api.GetIterator()
+            if iterator is None:
+                return OCRResult(words, self.psm)
+
+            level = tesserocr.RIL.WORD
+            block = par = line = 0
+            for word_iter in tesserocr.iterate_level(iterator, level):
+                # Нумерация блоков/абзацев/строк как в image_to_data
+                if word_iter.IsAtBeginningOf(tesserocr.RIL.BLOCK):
+                    block += 1
+                    par = 0
+                if word_iter.IsAtBeginningOf(tesserocr.RIL.PARA):
+                    par += 1
+                    line = 0
+                if word_iter.IsAtBeginningOf(tesserocr.RIL.TEXTLINE):
+                    line += 1
+
+                text = (word_iter.GetUTF8Text(level) or '').strip()
+                bbox = word_iter.BoundingBox(level)
+                if not text or not bbox:
+                    continue
+                x1, y1, x2, y2 = bbox
+                words.append({
+                    'text': text,
+                    'conf': float(word_iter.Confidence(level)),
+                    'left': x1,
+                    'top': y1,
+                    'width': x2 - x1,
+                    'height': y2 - y1,
+                    'block': block,
+                    'par': par,
+                    'line': line,
+                })
+        finally:
+            self.api.Clear()
+        return OCRResult(words, self.psm)
+
+    def close(self):
+        self.api.End()
+
+
+class OCREnginePool:
+    """Пул прогретых OCR движков, по одному на комбинацию язык/PSM (плюс копии для параллельной работы)"""
+    def __init__(self, max_idle=8, engine_class=None):
+        if engine_class is None:
+            engine_class = TesserocrEngine if tesserocr_available else PytesseractEngine
+        self.engine_class = engine_class
+        self.max_idle = max_idle
+        self.idle = OrderedDict()  # (language, psm) -> [engine, ...], порядок LRU
+        self.lock = threading.Lock()
+        self.logger = logging.getLogger(__name__)
+
+    @property
+    def in_process(self):
+        return self.engine_class.in_process
+
+    def create_engine(self, language, psm):
+        try:
+            return self.engine_class(language, psm)
+        except Exception as e:
+            # Например, нет traineddata для tesserocr - откатываемся на pytesseract
+            self.logger.warning(f"OCR engine init failed for {language}/psm {psm}, using pytesseract: {e}")
+            return PytesseractEngine(language, psm)
+
+    def acquire(self, language, psm):
+        """Забирает свободный движок из пула или создает новый"""
+        key = (language, psm)
+        with self.lock:
+            engines = self.idle.get(key)
+            if engines:
+                engine = engines.pop()
+                if not engines:
+                    del self.idle[key]
+                return engine
+        return self.create_engine(language, psm)
+
+    def release(self, engine):
+        """Возвращает движок в пул, вытесняя самые давно использованные"""
+        key = (engine.language, engine.psm)
+        evicted = []
+        with self.lock:
+            self.idle.setdefault(key, []).append(engine)
+            self.idle.move_to_end(key)
+            while sum(len(engines) for engines in self.idle.values()) > self.max_idle:
+                oldest_key = next(iter(self.idle))
+                evicted.append(self.idle[oldest_key].pop(0))
+                if not self.idle[oldest_key]:
+                    del self.idle[oldest_key]
+        for old_engine in evicted:
+            old_engine.close()
+
+    @contextmanager
+    def engine(self, language, psm):
+        engine = self.acquire(language, psm)
+        try:
+            yield engine
+        finally:
+            self.release(engine)
+
+    def recognize(self, image, language, psm):
+        with self.engine(language, psm) as engine:
+            return engine.recognize(image)
+
+    def warm_up(self, language, psm_modes):
+        """Заранее загружает языковые модели, чтобы первый OCR не ждал инициализации"""
+        if not self.in_process:
+            return
+        for psm in psm_modes:
+            self.release(self.acquire(language, psm))
+
+    def close(self):
+        with self.lock:
+            engines = [engine for key_engines in self.idle.values() for engine in key_engines]
+            self.idle.clear()
+        for engine in engines:
+            engine.close()
+
+
+class PSMStats:
+    """Статистика победивших PSM режимов по форме области и типу контента"""
+    min_samples = 5  # Сколько побед нужно, чтобы доверять историческому лидеру
+    confidence_margin = 5.0
+
+    def __init__(self, stats_file='psm_stats.json'):
+        self.stats_file = stats_file
+        self.stats = {}  # "shape|content_type" -> {"psm": {"wins": n, "confidence": сумма}}
+        self.lock = threading.Lock()
+        self.dirty = False
+        self.logger = logging.getLogger(__name__)
+        self.load()
+
+    @staticmethod
+    def shape_class(width, height):
+        """Грубая классификация формы выделенной области"""
+        aspect = width / max(height, 1)
+        if width < 150 and height < 60:
+            return "word"
+        if aspect >= 5 or height < 50:
+            return "line"
+        if aspect < 0.6:
+            return "column"
+        return "block"
+
+    def load(self):
+        if not os.path.exists(self.stats_file):
+            return
+        try:
+            with open(self.stats_file, 'r', encoding='utf-8') as f:
+                self.stats = json.load(f)
+        except Exception as e:
+            self.logger.error(f"Error loading PSM stats: {e}")
+
+    def save(self):
+        with self.lock:
+            if not self.dirty:
+                return
+            try:
+                with open(self.stats_file, 'w', encoding='utf-8') as f:
+                    json.dump(self.stats, f, indent=2)
+                self.dirty = False
+            except Exception as e:
+                self.logger.error(f"Error saving PSM stats: {e}")
+
+    def record(self, shape, content_type, psm, confidence):
+        """Запоминает победивший режим для формы области и типа контента"""
+        with self.lock:
+            entry = self.stats.setdefault(f"{shape}|{content_type}", {}).setdefault(str(psm), {'wins': 0, 'confidence': 0.0})
+            entry['wins'] += 1
+            entry['confidence'] += confidence
+            self.dirty = True
+
+    def wins_for(self, shape, content_type=None):
+        """Победы по режимам: для конкретного типа контента или суммарно по форме"""
+        wins = {}
+        with self.lock:
+            for key, modes in self.stats.items():
+                key_shape, key_type = key.split('|', 1)
+                if key_shape != shape or (content_type and key_type != content_type):
+                    continue
+                for psm, entry in modes.items():
+                    total = wins.setdefault(int(psm), {'wins': 0, 'confidence': 0.0})
+                    total['wins'] += entry['wins']
+                    total['confidence'] += entry['confidence']
+        if content_type and not wins:
+            return self.wins_for(shape)
+        return wins
+
+    def ordered_modes(self, shape, modes, content_type=None):
+        """Режимы в порядке исторических побед; без статистики - исходный порядок"""
+        wins = self.wins_for(shape, content_type)
+        return sorted(modes, key=lambda psm: (-wins.get(psm, {}).get('wins', 0), modes.index(psm)))
+
+    def expected_confidence(self, shape, psm, content_type=None):
+        """Обычная достоверность лидера для этой формы; None, если psm не устойчивый лидер"""
+        wins = self.wins_for(shape, content_type)
+        entry = wins.get(psm)
+        if not entry or entry['wins'] < self.min_samples:
+            return None
+        total_wins = sum(item['wins'] for item in wins.values())
+        if entry['wins'] * 2 < total_wins:
+            return None
+        return entry['confidence'] / entry['wins'] - self.confidence_margin
+
+
+class OCRResultCache:
+    """LRU кеш результатов OCR по хешу содержимого области и настроек обработки"""
+    prune_every = 100  # Через сколько записей на диск снова чистить дисковый кеш
+
+    def __init__(self, capacity=128, cache_dir=None, max_disk_entries=2000):
+        self.capacity = capacity
+        self.entries = OrderedDict()  # key -> {'raw_text', 'processed_text', 'content_type'}
+        self.cache_dir = Path(cache_dir) if cache_dir else None
+        self.max_disk_entries = max_disk_entries
+        self.writes_since_prune = 0
+        self.logger = logging.getLogger(__name__)
+        if self.cache_dir:
+            self.cache_dir.mkdir(exist_ok=True)
+            self.prune_disk()
+
+    @staticmethod
+    def make_key(roi, settings):
+        """Быстрый хеш пикселей области вместе с настройками, влияющими на результат"""
+        digest = hashlib.blake2b(digest_size=16)
+        digest.update(f"{roi.shape}|{roi.dtype}".encode())
+        digest.update(np.ascontiguousarray(roi).data)
+        digest.update(json.dumps(settings, sort_keys=True).encode())
+        return digest.hexdigest()
+
+    def get(self, key):
+        if self.capacity <= 0:
+            return None
+        entry = self.entries.get(key)
+        if entry is not None:
+            self.entries.move_to_end(key)
+            return entry
+
+        entry = self.load_from_disk(key)
+        if entry is not None:
+            self.store_in_memory(key, entry)
+        return entry
+
+    def put(self, key, raw_text, processed_text, content_type):
+        if self.capacity <= 0:
+            return
+        entry = {
+            'raw_text': raw_text,
+            'processed_text': processed_text,
+            'content_type': content_type
+        }
+        self.store_in_memory(key, entry)
+        self.save_to_disk(key, entry)
+
+    def store_in_memory(self, key, entry):
+        self.entries[key] = entry
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.capacity:
+            self.entries.popitem(last=False)
+
+    def load_from_disk(self, key):
+        if not self.cache_dir:
+            return None
+        cache_file = self.cache_dir / f"{key}.json"
+        if not cache_file.exists():
+            return None
+        try:
+            with open(cache_file, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except Exception as e:
+            self.logger.error(f"Failed to read OCR cache entry {key}: {e}")
+            return None
+
+    def save_to_disk(self, key, entry):
+        if not self.cache_dir:
+            return
+        try:
+            with open(self.cache_dir / f"{key}.json", 'w', encoding='utf-8') as f:
+                json.dump(entry, f, ensure_ascii=False)
+        except Exception as e:
+            self.logger.error(f"Failed to write OCR cache entry {key}: {e}")
+            return
+        self.writes_since_prune += 1
+        if self.writes_since_prune >= min(self.prune_every, self.max_disk_entries):
+            self.prune_disk()
+
+    def prune_disk(self):
+        """Удаляет самые старые записи дискового кеша сверх лимита"""
+        self.writes_since_prune = 0
+        files = sorted(self.cache_dir.glob("*.json"), key=lambda path: path.stat().st_mtime)
+        for old_file in files[:max(0, len(files) - self.max_disk_entries)]:
+            try:
+                old_file.unlink()
+            except OSError:
+                pass
+
+    def clear(self):
+        self.entries.clear()
+
+
+def to_gray(image):
+    """Оттенки серого из BGR, BGRA или уже серого изображения"""
+    if len(image.shape) == 2:
+        return image
+    if image.shape[2] == 4:
+        return cv2.cvtColor(image, cv2.COLOR_BGRA2GRAY)
+    return cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+
+
+class ImageQuality:
+    """Быстрая оценка изображения: шум, контраст текста, толщина штрихов и высота символов"""
+    noise_kernel = np.array([[1, -2, 1], [-2, 4, -2], [1, -2, 1]], np.float32)
+    flat_gradient = 24  # Шум меряем только на плоских участках, без краев букв
+    noisy_level = 2.0
+    crisp_noise = 1.0
+    low_contrast_level = 80
+    crisp_contrast = 120
+
+    def __init__(self, noise, contrast, stroke_width, text_height=0.0):
+        self.noise = noise  # Оценка сигмы шума (метод Immerkær)
+        self.contrast = contrast  # Разница средних яркостей текста и фона
+        self.stroke_width = stroke_width  # Типичная толщина штриха в пикселях
+        self.text_height = text_height  # Типичная высота символа в пикселях (0 - не найдено)
+
+    @classmethod
+    def estimate(cls, gray):
+        # Шум: отклик лапласиана второго порядка на участках без краев
+        response = np.abs(cv2.filter2D(gray.astype(np.float32), -1, cls.noise_kernel))
+        gradient = cv2.morphologyEx(gray, cv2.MORPH_GRADIENT, np.ones((3, 3), np.uint8))
+        flat = gradient < cls.flat_gradient
+        noise = float(np.sqrt(np.pi / 2) / 6 * response[flat].mean()) if flat.any() else float('inf')
+
+        # Текст - меньший из классов OTSU
+        _, binary = cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
+        text_mask = binary == 0 if np.count_nonzero(binary) > binary.size / 2 else binary == 255
+        if not text_mask.any() or text_mask.all():
+            return cls(noise, 0.0, 0.0)
+        contrast = float(abs(gray[text_mask].mean() - gray[~text_mask].mean()))
+
+        # Толщина штриха: удвоенное расстояние до края на средней линии штрихов
+        distance = cv2.distanceTransform(text_mask.astype(np.uint8), cv2.DIST_L2, 3)
+        ridge = (distance >= cv2.dilate(distance, np.ones((3, 3), np.uint8))) & (distance > 0)
+        stroke_width = float(2 * np.median(distance[ridge])) if ridge.any() else 0.0
+        return cls(noise, contrast, stroke_width, cls.text_height_of(text_mask))
+
+    @staticmethod
+    def text_height_of(text_mask):
+        """Медианная высота символов - связных компонент маски текста"""
+        _, _, stats, _ = cv2.connectedComponentsWithStats(text_mask.astype(np.uint8), connectivity=8)
+        heights = stats[1:, cv2.CC_STAT_HEIGHT]
+        widths = stats[1:, cv2.CC_STAT_WIDTH]
+        areas = stats[1:, cv2.CC_STAT_AREA]
+        # Без точек, шума, рамок и линий подчеркивания
+        glyphs = (areas >= 4) & (heights >= 3) & (heights < text_mask.shape[0] * 0.95) & (widths <= heights * 5)
+        return float(np.median(heights[glyphs])) if glyphs.any() else 0.0
+
+    @property
+    def noisy(self):
+        return self.noise >= self.noisy_level
+
+    @property
+    def low_contrast(self):
+        return self.contrast < self.low_contrast_level
+
+    @property
+    def crisp(self):
+        """Четкий текст с экрана: Tesseract справится без предобработки"""
+        return self.noise < self.crisp_noise and self.contrast >= self.crisp_contrast
+
+    def __str__(self):
+        return (f"noise {self.noise:.1f}, contrast {self.contrast:.0f}, stroke {self.stroke_width:.1f}px, "
+                f"text {self.text_height:.0f}px")
+
+
+class BufferPool:
+    """Пул рабочих буферов numpy по (форма, тип): повторная предобработка не выделяет память заново"""
+    def __init__(self, max_bytes=128 * 1024 * 1024, max_per_key=4):
+        self.max_bytes = max_bytes
+        self.max_per_key = max_per_key
+        self.free = OrderedDict()  # (shape, dtype) -> [буферы], от давно не использованных к свежим
+        self.free_bytes = 0
+        self.lock = threading.Lock()
+
+    def take(self, shape, dtype=np.uint8):
+        key = (tuple(shape), np.dtype(dtype).str)
+        with self.lock:
+            buffers = self.free.get(key)
+            if buffers:
+                buffer = buffers.pop()
+                if not buffers:
+                    del self.free[key]
+                self.free_bytes -= buffer.nbytes
+                return buffer
+        return np.empty(shape, dtype)
+
+    def give(self, *buffers):
+        """Вернуть буферы, полученные через take (их содержимое больше не нужно)"""
+        with self.lock:
+            for buffer in buffers:
+                key = (buffer.shape, buffer.dtype.str)
+                bucket = self.free.setdefault(key, [])
+                self.free.move_to_end(key)
+                if len(bucket) >= self.max_per_key or buffer.nbytes > self.max_bytes:
+                    continue
+                bucket.append(buffer)
+                self.free_bytes += buffer.nbytes
+            # Вытесняем буферы давно не встречавшихся размеров
+            while self.free_bytes > self.max_bytes:
+                key, bucket = next(iter(self.free.items()))
+                self.free_bytes -= bucket.pop().nbytes
+                if not bucket:
+                    del self.free[key]
+            for key in [key for key, bucket in self.free.items() if not bucket]:
+                del self.free[key]
+
+    def clear(self):
+        with self.lock:
+            self.free.clear()
+            self.free_bytes = 0
+
+
+class PreprocessingPipeline:
+    """Предобработка для OCR: цепочка именованных стадий с замером времени каждой"""
+    stage_names = ('upscale', 'blur', 'denoise', 'clahe', 'binarize', 'morphology')
+    denoise_methods = ('nlmeans', 'bilateral')
+    binarization_methods = ('adaptive', 'otsu', 'sauvola')
+    proxy_size = 512  # Длинная сторона копии для выбора бинаризации
+    adaptive_window = 11
+    sauvola_window = 31
+    sauvola_k = 0.2
+    target_text_height = 30  # Высота символов, на которой Tesseract распознает лучше всего
+    kernels = {size: cv2.getStructuringElement(cv2.MORPH_RECT, (size, size)) for size in (1, 2, 3)}
+    # Локальные стадии, которые можно считать полосами параллельно: перекрытие >= радиуса влияния
+    tile_halo = {'blur': 4, 'denoise': 24, 'morphology': 16}
+    tile_min_pixels = 2000000
+    tile_min_rows = 64
+    opencv_threads_lock = threading.Lock()
+
+    def __init__(self, scale_factor=3, high_quality=False, adaptive=True, enabled_stages=None, timing_hook=None,
+                 denoise_first=False, denoise_method='nlmeans', binarization_method='auto', auto_scale=True,
+                 buffer_pool=None, tile_workers=0):
+        self.scale_factor = scale_factor  # При auto_scale - верхняя граница увеличения
+        self.auto_scale = auto_scale
+        self.high_quality = high_quality
+        self.denoise_first = denoise_first
+        self.denoise_method = denoise_method
+        self.binarization_method = binarization_method  # 'auto' - выбор по уменьшенной копии
+        self.adaptive = adaptive  # Пропускать стадии, ненужные для изображения такого качества
+        self.enabled_stages = set(self.stage_names if enabled_stages is None else enabled_stages)
+        self.timing_hook = timing_hook  # callable(stage_name, seconds)
+        self.buffer_pool = buffer_pool or BufferPool()
+        self.local = threading.local()  # CLAHE на поток: объект хранит внутренние буферы
+        self.tile_workers = tile_workers or os.cpu_count() or 1  # 0 - по числу ядер
+        self.executor = None
+        self.last_quality = None
+        self.last_timings = []
+        self.last_binarization = None
+        self.last_scale = None
+
+    @property
+    def stage_order(self):
+        if self.denoise_first:
+            # Шумоподавление на исходном разрешении: в scale_factor² раз меньше пикселей
+            return ('denoise', 'upscale', 'blur', 'clahe', 'binarize', 'morphology')
+        return self.stage_names
+
+    def scale_for(self, quality):
+        """Наименьшее увеличение, доводящее символы до target_text_height (не больше scale_factor)"""
+        if not self.auto_scale or quality is None or not quality.text_height:
+            return self.scale_factor
+        return min(self.scale_factor, max(1.0, self.target_text_height / quality.text_height))
+
+    def skipped_stages(self, quality, scale):
+        """Стадии, которые не улучшат изображение такого качества"""
+        if quality.crisp:
+            # Только увеличение: бинаризацию Tesseract сделает сам
+            return {'blur', 'denoise', 'clahe', 'binarize', 'morphology'}
+        skipped = set()
+        if not quality.noisy:
+            skipped.update(('blur', 'denoise'))
+        if not quality.low_contrast:
+            skipped.add('clahe')
+        if quality.stroke_width * scale < 3:
+            # Открытие ядром 2x2 стерло бы тонкие штрихи
+            skipped.add('morphology')
+        return skipped
+
+    def run(self, image):
+        """Прогоняет изображение через стадии; каждая пишет в буфер из пула (dst=)"""
+        timings = []
+        pool = self.buffer_pool
+        current, owned = image, False  # owned - current взят из пула и его можно вернуть
+
+        def timed(name, stage, *args):
+            started = time.perf_counter()
+            result = stage(*args)
+            elapsed = time.perf_counter() - started
+            timings.append((name, elapsed))
+            if self.timing_hook is not None:
+                self.timing_hook(name, elapsed)
+            return result
+
+        def step(name, stage, shape):
+            nonlocal current, owned
+            dst = pool.take(shape)
+            if name in self.tile_halo and self.tile_count(current) > 1:
+                timed(name, self.run_tiled, stage, current, dst, self.tile_halo[name])
+            else:
+                timed(name, stage, current, dst)
+            if owned:
+                pool.give(current)
+            current, owned = dst, True
+
+        # Оттенки серого до увеличения: в три раза меньше пикселей для resize
+        if len(image.shape) == 3:
+            step('grayscale', self.grayscale, image.shape[:2])
+        skipped = set()
+        quality = None
+        self.last_binarization = None
+        if self.adaptive or self.auto_scale:
+            quality = timed('analyze', ImageQuality.estimate, current)
+        scale = self.scale_for(quality)
+        if self.adaptive:
+            skipped = self.skipped_stages(quality, scale)
+
+        for name in self.stage_order:
+            if name not in self.enabled_stages or name in skipped:
+                continue
+            if name == 'upscale':
+                if scale == 1:
+                    continue
+                height, width = current.shape
+                step(name, self.upscale, (int(height * scale), int(width * scale)))
+            else:
+                step(name, getattr(self, name), current.shape)
+
+        self.last_quality = quality
+        self.last_scale = scale
+        self.last_timings = timings
+        # Итоговый буфер переходит вызывающему и в пул не возвращается
+        return current if owned else current.copy()
+
+    def variants(self, image):
+        """Варианты изображения для ансамбля OCR в одном масштабе: серое, adaptive, OTSU, CLAHE"""
+        gray = to_gray(image)
+        scale = self.scale_for(ImageQuality.estimate(gray) if self.auto_scale else None)
+        if scale != 1:
+            height, width = gray.shape
+            gray = self.upscale(gray, np.empty((int(height * scale), int(width * scale)), np.uint8))
+        return {
+            'gray': gray,
+            'adaptive': self.threshold(gray, 'adaptive'),
+            'otsu': self.threshold(gray, 'otsu'),
+            'clahe': self.clahe(gray, None),
+        }
+
+    def tile_count(self, image):
+        """Сколько полос дать пулу потоков (1 - считать целиком)"""
+        if self.tile_workers <= 1 or image.size < self.tile_min_pixels:
+            return 1
+        return max(1, min(self.tile_workers, image.shape[0] // self.tile_min_rows))
+
+    def run_tiled(self, stage, src, dst, halo):
+        """Стадия по горизонтальным полосам с перекрытием halo в пуле потоков (OpenCV отпускает GIL)"""
+        if self.executor is None:
+            self.executor = ThreadPoolExecutor(max_workers=self.tile_workers, thread_name_prefix="preprocess")
+        height = src.shape[0]
+        bounds = np.linspace(0, height, self.tile_count(src) + 1).astype(int)
+
+        def process_tile(y1, y2):
+            top, bottom = max(0, y1 - halo), min(height, y2 + halo)
+            tile = self.buffer_pool.take((bottom - top,) + src.shape[1:])
+            try:
+                stage(src[top:bottom], tile)
+                # Края полосы (искажены границей) отбрасываются, склейка без швов
+                dst[y1:y2] = tile[y1 - top:y2 - top]
+            finally:
+                self.buffer_pool.give(tile)
+
+        # Внутренние потоки OpenCV делим между полосами, чтобы не было переподписки ядер
+        with self.opencv_threads_lock:
+            previous_threads = cv2.getNumThreads()
+            cv2.setNumThreads(max(1, (os.cpu_count() or 1) // self.tile_workers))
+            try:
+                futures = [self.executor.submit(process_tile, y1, y2) for y1, y2 in zip(bounds[:-1], bounds[1:])]
+                for future in futures:
+                    future.result()
+            finally:
+                cv2.setNumThreads(previous_threads)
+        return dst
+
+    def close(self):
+        if self.executor is not None:
+            self.executor.shutdown(wait=False)
+            self.executor = None
+
+    def grayscale(self, image, dst):
+        code = cv2.COLOR_BGRA2GRAY if image.shape[2] == 4 else cv2.COLOR_BGR2GRAY
+        return cv2.cvtColor(image, code, dst=dst)
+
+    def upscale(self, gray, dst):
+        # Используем INTER_CUBIC для лучшего качества при увеличении
+        return cv2.resize(gray, (dst.shape[1], dst.shape[0]), dst=dst, interpolation=cv2.INTER_CUBIC)
+
+    def blur(self, gray, dst):
+        # Применяем Gaussian blur для сглаживания шума
+        if self.high_quality:
+            return cv2.GaussianBlur(gray, (3, 3), 0, dst=dst)
+        return cv2.GaussianBlur(gray, (1, 1), 0, dst=dst)
+
+    def denoise(self, gray, dst):
+        if self.denoise_method == 'bilateral':
+            # Сохраняющий края фильтр - на порядок быстрее NL-means
+            diameter = 5 if self.denoise_first else 9
+            return cv2.bilateralFilter(gray, diameter, 40, diameter / 2, dst=dst)
+        if self.denoise_first:
+            # Окна NL-means в масштабе исходного разрешения (буквы в scale_factor раз меньше)
+            if self.high_quality:
+                return cv2.fastNlMeansDenoising(gray, dst, h=8, templateWindowSize=5, searchWindowSize=11)
+            return cv2.fastNlMeansDenoising(gray, dst, h=10, templateWindowSize=5, searchWindowSize=9)
+        if self.high_quality:
+            # Более сильная денойзинг обработка для высокого качества
+            return cv2.fastNlMeansDenoising(gray, dst, h=8, templateWindowSize=9, searchWindowSize=23)
+        return cv2.fastNlMeansDenoising(gray, dst, h=10, templateWindowSize=7, searchWindowSize=21)
+
+    def clahe(self, gray, dst):
+        # Улучшение контраста с помощью CLAHE (экземпляр переиспользуется в потоке)
+        clahe = getattr(self.local, 'clahe', None)
+        if clahe is None:
+            clahe = self.local.clahe = cv2.createCLAHE(clipLimit=2.0, tileGridSize=(8, 8))
+        return clahe.apply(gray, dst)
+
+    def binarize(self, gray, dst):
+        method = self.binarization_method
+        if method == 'auto':
+            method = self.choose_binarization(gray)
+        self.last_binarization = method
+        return self.threshold(gray, method, dst=dst)
+
+    @staticmethod
+    def window_size(size, scale):
+        """Нечетное окно локального порога для изображения в масштабе scale от полного"""
+        return max(3, int(size * scale) | 1)
+
+    def threshold(self, gray, method, scale=1.0, dst=None):
+        """Бинаризация одним методом: текст черный, фон белый"""
+        if method == 'adaptive':
+            # Адаптивная бинаризация для неравномерного фона
+            return cv2.adaptiveThreshold(
+                gray, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C, cv2.THRESH_BINARY,
+                self.window_size(self.adaptive_window, scale), 2, dst=dst
+            )
+        if method == 'sauvola':
+            return self.sauvola(gray, self.window_size(self.sauvola_window, scale), dst)
+        _, binary = cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU, dst=dst)
+        return binary
+
+    def sauvola(self, gray, window, dst=None):
+        """Sauvola: порог по локальным среднему и отклонению, T = m * (1 + k * (s / R - 1))"""
+        pool = self.buffer_pool
+        values, mean, work, square = (pool.take(gray.shape, np.float32) for _ in range(4))
+        try:
+            np.copyto(values, gray)
+            cv2.boxFilter(values, -1, (window, window), dst=mean)
+            np.multiply(values, values, out=work)
+            cv2.boxFilter(work, -1, (window, window), dst=work)
+            np.multiply(mean, mean, out=square)
+            np.subtract(work, square, out=work)
+            np.maximum(work, 0, out=work)
+            np.sqrt(work, out=work)  # Локальное отклонение s
+            np.multiply(work, self.sauvola_k / 128, out=work)
+            np.add(work, 1 - self.sauvola_k, out=work)
+            np.multiply(work, mean, out=work)  # Порог T
+            return cv2.compare(values, work, cv2.CMP_GT, dst=dst)
+        finally:
+            pool.give(values, mean, work, square)
+
+    @staticmethod
+    def binarization_score(gray, binary):
+        """Качество бинаризации: совпадение ее контуров с краями исходника, минус мелкий мусор"""
+        kernel = PreprocessingPipeline.kernels[3]
+        gradient = cv2.morphologyEx(gray, cv2.MORPH_GRADIENT, kernel)
+        _, source_edges = cv2.threshold(gradient, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
+        binary_edges = cv2.morphologyEx(binary, cv2.MORPH_GRADIENT, kernel)
+        if not source_edges.any() or not binary_edges.any():
+            return 0.0
+        precision = np.count_nonzero(binary_edges & source_edges) / np.count_nonzero(binary_edges)
+        recall = np.count_nonzero(source_edges & binary_edges) / np.count_nonzero(source_edges)
+        if precision + recall == 0:
+            return 0.0
+        f_measure = 2 * precision * recall / (precision + recall)
+
+        # Доля крошечных компонент текста - шум, который бинаризация вытащила из фона
+        count, _, stats, _ = cv2.connectedComponentsWithStats(255 - binary, connectivity=8)
+        if count <= 1:
+            return f_measure
+        specks = np.count_nonzero(stats[1:, cv2.CC_STAT_AREA] <= 2)
+        return f_measure * (1 - specks / (count - 1))
+
+    def choose_binarization(self, gray):
+        """Выбор метода бинаризации по уменьшенной копии; на полном разрешении считается только победитель"""
+        height, width = gray.shape
+        scale = min(1.0, self.proxy_size / max(height, width))
+        proxy = gray if scale == 1.0 else cv2.resize(
+            gray, (max(1, int(width * scale)), max(1, int(height * scale))), interpolation=cv2.INTER_AREA)
+        scores = {method: self.binarization_score(proxy, self.threshold(proxy, method, scale))
+                  for method in self.binarization_methods}
+        return max(scores, key=scores.get)
+
+    def morphology(self, binary, dst):
+        temp = self.buffer_pool.take(binary.shape)
+        try:
+            if self.high_quality:
+                # Более тщательная обработка для высокого качества
+                # Удаляем очень мелкий шум
+                cv2.morphologyEx(binary, cv2.MORPH_OPEN, self.kernels[1], dst=dst, iterations=1)
+                
+                # Заполняем пробелы в буквах
+                cv2.morphologyEx(dst, cv2.MORPH_CLOSE, self.kernels[2], dst=temp, iterations=2)
+                
+                # Дополнительная очистка
+                cv2.morphologyEx(temp, cv2.MORPH_GRADIENT, self.kernels[3], dst=dst, iterations=1)
+                cv2.bitwise_or(temp, dst, dst=temp)
+                
+                # Финальная очистка
+                return cv2.medianBlur(temp, 5, dst=dst)
+                
+            # Стандартная обработка
+            # Удаляем мелкий шум
+            cv2.morphologyEx(binary, cv2.MORPH_OPEN, self.kernels[2], dst=dst, iterations=1)
+            
+            # Заполняем пробелы в буквах
+            cv2.morphologyEx(dst, cv2.MORPH_CLOSE, self.kernels[2], dst=temp, iterations=1)
+            
+            # Дополнительная очистка от мелких артефактов
+            return cv2.medianBlur(temp, 3, dst=dst)
+        finally:
+            self.buffer_pool.give(temp)
+
+
+class DebugImageWriter:
+    """Фоновая запись отладочных изображений: очередь с лимитом памяти, GUI поток не ждет диск"""
+    formats = ('png', 'jpg', 'webp')
+
+    def __init__(self, debug_dir="debug_images", image_format='png', compression=1,
+                 max_queued_bytes=64 * 1024 * 1024):
+        self.debug_dir = debug_dir
+        self.image_format = image_format
+        self.compression = compression  # 0-9: уровень сжатия PNG; для JPEG/WebP качество 100 - 10 * compression
+        self.max_queued_bytes = max_queued_bytes
+        self.queue = queue.Queue()
+        self.queued_bytes = 0
+        self.dropped = 0
+        self.sequence = 0
+        self.thread = None
+        self.lock = threading.Lock()
+        self.logger = logging.getLogger(__name__)
+
+    def new_request_id(self):
+        """Уникальный ID запроса OCR: время с миллисекундами и порядковый номер"""
+        with self.lock:
+            self.sequence += 1
+            sequence = self.sequence
+        return f"{datetime.now().strftime('%Y%m%d_%H%M%S_%f')[:-3]}_{sequence:04d}"
+
+    def write_params(self):
+        if self.image_format == 'jpg':
+            return [cv2.IMWRITE_JPEG_QUALITY, 100 - 10 * self.compression]
+        if self.image_format == 'webp':
+            return [cv2.IMWRITE_WEBP_QUALITY, max(1, 100 - 10 * self.compression)]
+        return [cv2.IMWRITE_PNG_COMPRESSION, self.compression]
+
+    def submit(self, name, image):
+        """Поставить изображение в очередь; при переполнении оно отбрасывается, а не тормозит GUI"""
+        with self.lock:
+            if self.queued_bytes + image.nbytes > self.max_queued_bytes:
+                self.dropped += 1
+                self.logger.warning(f"Debug image queue full, dropped {name} ({self.dropped} dropped so far)")
+                return False
+            self.queued_bytes += image.nbytes
+            if self.thread is None:
+                self.thread = threading.Thread(target=self.run, name="debug-image-writer", daemon=True)
+                self.thread.start()
+        self.queue.put((name, image))
+        return True
+
+    def run(self):
+        while True:
+            item = self.queue.get()
+            if item is None:
+                break
+            name, image = item
+            try:
+                os.makedirs(self.debug_dir, exist_ok=True)
+                extension = self.image_format if self.image_format in self.formats else 'png'
+                path = os.path.join(self.debug_dir, f"{name}.{extension}")
+                if cv2.imwrite(path, image, self.write_params()):
+                    self.logger.debug(f"Debug image saved: {path}")
+                else:
+                    self.logger.warning(f"Failed to save debug image {path}")
+            except Exception as e:
+                self.logger.warning(f"Failed to save debug image {name}: {e}")
+            finally:
+                with self.lock:
+                    self.queued_bytes -= image.nbytes
+
+    def close(self, timeout=5):
+        """Дописать очередь и остановить поток"""
+        with self.lock:
+            thread, self.thread = self.thread, None
+        if thread is not None:
+            self.queue.put(None)
+            thread.join(timeout)
+
+
+class PerceptualHashIndex:
+    """Индекс pHash для поиска почти одинаковых выделений (шум сжатия, сдвиг рамки на пару пикселей)"""
+    shift_margin = 4  # Допустимый сдвиг рамки выделения в пикселях
+    pixel_threshold = 16  # Как у FrameChangeDetector: правка символа дает десятки, шум - единицы
+    mean_threshold = 2.0  # Сдвиг средней яркости (другая подсветка, затемнение)
+    phash_min_height = 32  # Ниже pHash (растяжение до 32x32) меняется от сдвига на пиксель - его не проверяем
+
+    def __init__(self, max_distance=10, capacity=256, max_bytes=64 * 1024 * 1024):
+        self.max_distance = max_distance
+        self.entries = deque(maxlen=capacity)  # (fingerprint, settings_key, cache_key)
+        self.max_bytes = max_bytes
+
+    @staticmethod
+    def phash(gray):
+        """64-битный pHash: знаки низкочастотных DCT коэффициентов относительно медианы"""
+        small = cv2.resize(gray, (32, 32), interpolation=cv2.INTER_AREA).astype(np.float32)
+        low_freq = cv2.dct(small)[:8, :8].flatten()
+        bits = low_freq > np.median(low_freq[1:])
+        return int.from_bytes(np.packbits(bits).tobytes(), 'big')
+
+    @classmethod
+    def fingerprint(cls, image):
+        gray = np.array(to_gray(image))  # Копия: выделение может быть видом на кадр захвата
+        height, width = gray.shape
+        return {
+            'hash': cls.phash(gray),
+            'aspect': width / height,
+            'gray': gray
+        }
+
+    @staticmethod
+    def hamming(first, second):
+        return bin(first ^ second).count('1')
+
+    @staticmethod
+    def half_size(gray):
+        height, width = gray.shape
+        if height < 2 or width < 2:
+            return gray
+        return cv2.resize(gray, (width // 2, height // 2), interpolation=cv2.INTER_AREA)
+
+    def images_match(self, first, second):
+        """pHash дает только кандидата: подтверждаем попиксельно в исходном разрешении после выравнивания сдвига"""
+        (height, width), (other_height, other_width) = first.shape, second.shape
+        if abs(height - other_height) > self.shift_margin or abs(width - other_width) > self.shift_margin:
+            return False
+        # Низкое выделение (одна строка) - поле сдвига уменьшаем, чтобы от шаблона осталась строка
+        margin_y = min(self.shift_margin, other_height // 4)
+        margin_x = min(self.shift_margin, other_width // 4)
+        template = second[margin_y:other_height - margin_y, margin_x:other_width - margin_x]
+        if template.shape[0] > height or template.shape[1] > width:
+            return False
+        scores = cv2.matchTemplate(first, template, cv2.TM_SQDIFF)
+        _, _, (x, y), _ = cv2.minMaxLoc(scores)
+        aligned = first[y:y + template.shape[0], x:x + template.shape[1]]
+        # Половинное разрешение уже выровненных копий гасит шум, но правка одного символа остается
+        aligned, template = self.half_size(aligned), self.half_size(template)
+        if cv2.absdiff(aligned, template).max() > self.pixel_threshold:
+            return False
+        return abs(cv2.mean(aligned)[0] - cv2.mean(template)[0]) <= self.mean_threshold
+
+    def find(self, fingerprint, settings_key):
+        """Ключ кеша ранее обработанного почти одинакового выделения или None"""
+        for candidate, candidate_settings, cache_key in reversed(self.entries):
+            if candidate_settings != settings_key:
+                continue
+            if abs(candidate['aspect'] - fingerprint['aspect']) > 0.1 * candidate['aspect']:
+                continue
+            if candidate['gray'].shape[0] >= self.phash_min_height and \
+                    self.hamming(candidate['hash'], fingerprint['hash']) > self.max_distance:
+                continue
+            if self.images_match(fingerprint['gray'], candidate['gray']):
+                return cache_key
+        return None
+
+    def add(self, fingerprint, settings_key, cache_key):
+        self.entries.append((fingerprint, settings_key, cache_key))
+        # Храним изображения в исходном разрешении - старые вытесняем по объему
+        while sum(entry[0]['gray'].nbytes for entry in self.entries) > self.max_bytes and len(self.entries) > 1:
+            self.entries.popleft()
+
+    def clear(self):
+        self.entries.clear()
+
+
+# Пул движков внутри процесса-воркера параллельного OCR (свой в каждом процессе)
+_process_engine_pool = None
+
+
+def init_ocr_process(omp_threads):
+    """Инициализация процесса OCR пула: ограничиваем потоки OpenMP до первой загрузки tesserocr"""
+    os.environ['OMP_THREAD_LIMIT'] = str(omp_threads)
+    os.environ['OMP_NUM_THREADS'] = str(omp_threads)
+
+
+def recognize_in_ocr_process(image, language, psm):
+    """Один проход PSM в процессе пула; движки остаются прогретыми между запросами"""
+    global _process_engine_pool
+    if _process_engine_pool is None:
+        _process_engine_pool = OCREnginePool()
+    return _process_engine_pool.recognize(image, language, psm)
+
+
+def ocr_parallel_passes():
+    """Сколько PSM проходов держать в работе одновременно: при раннем выходе лишней работы немного"""
+    return max(1, (os.cpu_count() or 1) // 2)
+
+
+def create_ocr_process_pool(task_count):
+    """Пул процессов по числу ядер; потоки OpenMP делятся между процессами без переподписки CPU"""
+    cpu_count = os.cpu_count() or 1
+    workers = max(1, min(task_count, cpu_count))
+    omp_threads = max(1, cpu_count // workers)
+    # spawn: при fork дочерний процесс унаследовал бы уже загруженный Tesseract без ограничения потоков
+    return ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn'),
+                               initializer=init_ocr_process, initargs=(omp_threads,))
+
+
 class OCRWorker(QThread):
     result_ready = pyqtSignal(str, str, str)  # raw_text, processed_text, content_type
+    partial_result = pyqtSignal(str, str, str)  # Черновик: raw_text, ответ GPT на данный момент, content_type
     error_occurred = pyqtSignal(str)
     progress_updated = pyqtSignal(int)  # progress percentage
     
-    def __init__(self, image, use_openai=False, api_key=None, model='gpt-4o', interview_mode=False, debug_console=False):
+    partial_interval = 0.15  # Не чаще раза в 150 мс обновляем потоковый ответ GPT
+    
+    # Пробуем разные PSM режимы для лучшего результата
+    # 6 - Uniform block of text
+    # 8 - Single word
+    # 7 - Single text line
+    # 11 - Sparse text (find as much text as possible)
+    # 4 - Single column of text
+    # 13 - Raw line (treat as single text line, no OSD)
+    psm_modes = [6, 11, 4, 7, 8, 13]  # Расширенный набор режимов
+
+    def __init__(self, image, use_openai=False, api_key=None, model='gpt-4o', interview_mode=False, debug_console=False,
+                 language='eng', engine_pool=None, process_pool=None, confidence_threshold=100,
+                 psm_stats=None, shape_class=None, content_type_hint=None, blocks=None,
+                 stream_results=True, variants=None):
         super().__init__()
         self.image = image
+        self.language = language
+        self.engine_pool = engine_pool or OCREnginePool()
+        self.process_pool = process_pool
+        self.confidence_threshold = confidence_threshold
+        self.psm_stats = psm_stats
+        self.shape_class = shape_class
+        self.content_type_hint = content_type_hint
+        self.blocks = blocks
+        self.variants = variants  # {название: PIL изображение} для ансамбля с голосованием по словам
         self.use_openai = use_openai
         self.api_key = api_key
         self.model = model
         self.interview_mode = interview_mode
         self.debug_console = debug_console
+        self.stream_results = stream_results
+        self.last_partial_text = None
+        self.modes_run = 0  # Сколько PSM проходов дали результат в find_best_result
         self.cancelled = False
         
     def cancel(self):
         self.cancelled = True
-        
+
+    @staticmethod
+    def clean_text(text):
+        """Нормализует пробелы внутри строк и убирает пустые строки"""
+        cleaned_lines = []
+        for line in text.split('\n'):
+            # Убираем лишние пробелы в строке, но сохраняем структуру
+            cleaned_line = ' '.join(line.split())
+            if cleaned_line:  # Только непустые строки
+                cleaned_lines.append(cleaned_line)
+        return '\n'.join(cleaned_lines)
+
+    def emit_partial_ocr(self, result):
+        """Показывает промежуточный текст OCR, пока остальные проходы еще идут"""
+        if not self.stream_results or result is None or self.cancelled:
+            return
+        text = self.clean_text(result.text)
+        if text and text != self.last_partial_text:
+            self.last_partial_text = text
+            self.partial_result.emit(text, "", "")
+
+    def recognize(self, psm):
+        """Один проход Tesseract в заданном PSM режиме через пул движков"""
+        return self.engine_pool.recognize(self.image, self.language, psm)
+
+    def candidate_modes(self):
+        """PSM режимы, начиная с исторического победителя для этой формы области"""
+        if self.psm_stats is None or self.shape_class is None:
+            return list(self.psm_modes)
+        return self.psm_stats.ordered_modes(self.shape_class, self.psm_modes, self.content_type_hint)
+
+    def beats_threshold(self, result):
+        """Достаточно ли хорош результат, чтобы не запускать остальные режимы"""
+        threshold = self.confidence_threshold
+        if self.psm_stats is not None and self.shape_class is not None:
+            expected = self.psm_stats.expected_confidence(self.shape_class, result.psm, self.content_type_hint)
+            if expected is not None:
+                # Исторический лидер выдал обычную для себя достоверность - хвост можно пропустить
+                threshold = min(threshold, expected)
+        return result.confidence > threshold
+
+    def iter_sequential_results(self, psm_modes, failures):
+        """Проходы PSM по очереди в текущем потоке"""
+        for psm in psm_modes:
+            if self.cancelled:
+                return
+            try:
+                result = self.recognize(psm)
+            except Exception as e:
+                failures.append(e)
+                continue
+            yield result
+
+    def iter_parallel_results(self, psm_modes, failures):
+        """Проходы PSM в пуле процессов; результаты отдаются по мере готовности"""
+        queued = list(psm_modes)
+        pending = set()
+        window = ocr_parallel_passes()
+        pool_broken = False
+        try:
+            while (queued or pending) and not self.cancelled:
+                # Запущенный проход не отменить - новые отправляем, только когда освободилось место
+                while queued and len(pending) < window and not pool_broken:
+                    try:
+                        pending.add(self.process_pool.submit(recognize_in_ocr_process, self.image,
+                                                             self.language, queued[0]))
+                    except Exception as e:
+                        # Пул процессов сломан или закрыт - остальные режимы последовательно
+                        if self.debug_console:
+                            print(f"⚠️ OCR process pool unavailable, running sequentially: {e}")
+                        pool_broken = True
+                        break
+                    queued.pop(0)
+                if pool_broken and not pending:
+                    yield from self.iter_sequential_results(queued, failures)
+                    return
+                done, pending = wait(pending, timeout=0.1, return_when=FIRST_COMPLETED)
+                for future in done:
+                    try:
+                        result = future.result()
+                    except Exception as e:
+                        failures.append(e)
+                        continue
+                    yield result
+        finally:
+            # Ранний выход или отмена: еще не начатые проходы больше не нужны
+            for future in pending:
+                future.cancel()
+
+    def recognize_blocks(self):
+        """Параллельный OCR текстовых блоков, каждый в своем PSM режиме"""
+        pending = [block for block in self.blocks if block.result is None]
+        failures = []
+        if pending:
+            workers = max(1, min(len(pending), os.cpu_count() or 1))
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                futures = {
+                    executor.submit(self.engine_pool.recognize, block.image, self.language, block.psm): block
+                    for block in pending
+                }
+                for future in as_completed(futures):
+                    if self.cancelled:
+                        for other in futures:
+                            other.cancel()
+                        return None
+                    block = futures[future]
+                    try:
+                        block.result = future.result()
+                    except Exception as e:
+                        failures.append(e)
+                        block.result = OCRResult([], block.psm)
+                    self.emit_partial_ocr(self.merge_blocks())
+                        
+        if failures and len(failures) == len(pending):
+            raise failures[-1]
+        return self.merge_blocks()
+
+    def recognize_variants(self):
+        """Параллельный OCR вариантов предобработки и пословное голосование по достоверности"""
+        psm = self.candidate_modes()[0]
+        results = {}
+        failures = []
+        with ThreadPoolExecutor(max_workers=len(self.variants)) as executor:
+            futures = {
+                executor.submit(self.engine_pool.recognize, image, self.language, psm): name
+                for name, image in self.variants.items()
+            }
+            for future in as_completed(futures):
+                if self.cancelled:
+                    for other in futures:
+                        other.cancel()
+                    return None
+                try:
+                    results[futures[future]] = future.result()
+                except Exception as e:
+                    failures.append(e)
+                    continue
+                self.emit_partial_ocr(OCRResult.vote(results.values())[0])
+                
+        if failures and len(failures) == len(self.variants):
+            raise failures[-1]
+        voted, changed = OCRResult.vote(results.values())
+        if self.debug_console:
+            confidences = ', '.join(f"{name} {result.confidence:.1f}" for name, result in results.items())
+            print(f"🗳 Ensemble PSM {psm}: {confidences}; {changed} words taken from other variants")
+        return voted
+
+    def merge_blocks(self):
+        """Текст готовых блоков в порядке чтения (еще не распознанные пропускаются)"""
+        # Строки закрепленной области (с подписями) - это один текст, а не отдельные блоки
+        as_lines = all(block.signature is not None for block in self.blocks)
+        return OCRResult.merge([block.result for block in self.blocks if block.result is not None],
+                               as_lines=as_lines)
+
+    def find_best_result(self, psm_modes):
+        """Выбирает проход с наивысшей достоверностью, выходя досрочно при достижении порога"""
+        best_result = None
+        fallback_result = None
+        failures = []
+
+        if self.process_pool is not None and len(psm_modes) > 1:
+            results = self.iter_parallel_results(psm_modes, failures)
+        else:
+            results = self.iter_sequential_results(psm_modes, failures)
+
+        self.modes_run = 0
+        for result in results:
+            self.modes_run += 1
+            if fallback_result is None and result.text:
+                fallback_result = result
+
+            # Используем текст с наивысшей достоверностью
+            best_confidence = best_result.confidence if best_result else 0
+            if result.confidence > best_confidence and result.text:
+                best_result = result
+                self.emit_partial_ocr(best_result)
+
+            if best_result is not None and self.beats_threshold(best_result):
+                break
+        results.close()
+
+        # Если ни один режим не дал хорошего результата, используем первый непустой
+        if best_result is None:
+            best_result = fallback_result
+        if best_result is None and failures and len(failures) == len(psm_modes):
+            raise failures[-1]
+
+        if self.debug_console and best_result:
+            print(f"🔎 Best PSM: {best_result.psm} (confidence {best_result.confidence:.1f}, "
+                  f"{len(best_result.words)} words)")
+        return best_result
+
     def classify_content(self, text, interview_mode=False):
         """Определяет тип контента: вопрос, задача или обычный текст"""
         text_lower = text.lower().strip()
@@ -576,17 +2036,46 @@ class OCRWorker(QThread):
 
 {text}"""
             
-        response = client.chat.completions.create(
+        messages = [
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": user_prompt}
+        ]
+        if not self.stream_results:
+            response = client.chat.completions.create(
+                model=self.model,
+                messages=messages,
+                temperature=0.3,
+                max_tokens=4000
+            )
+            return response.choices[0].message.content.strip()
+            
+        # Потоковый ответ: показываем текст GPT по мере генерации
+        stream = client.chat.completions.create(
             model=self.model,
-            messages=[
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": user_prompt}
-            ],
+            messages=messages,
             temperature=0.3,
-            max_tokens=4000
+            max_tokens=4000,
+            stream=True
         )
-        
-        return response.choices[0].message.content.strip()
+        parts = []
+        last_emit = 0
+        try:
+            for chunk in stream:
+                if self.cancelled:
+                    break
+                if not chunk.choices:
+                    continue
+                delta = chunk.choices[0].delta.content
+                if not delta:
+                    continue
+                parts.append(delta)
+                now = time.monotonic()
+                if now - last_emit >= self.partial_interval:
+                    last_emit = now
+                    self.partial_result.emit(text, ''.join(parts).strip(), content_type)
+        finally:
+            stream.close()
+        return ''.join(parts).strip()
         
     def run(self):
         try:
@@ -597,102 +2086,547 @@ class OCRWorker(QThread):
             # Улучшенные настройки Tesseract для лучшего распознавания
             custom_config = r'--oem 3 --psm 6 -c tessedit_char_whitelist=0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyzАБВГДЕЁЖЗИЙКЛМНОПРСТУФХЦЧШЩЪЫЬЭЮЯабвгдеёжзийклмнопрстуфхцчшщъыьэюя .,!?()[]{}":;+-=*/\\|_@#$%^&<>~`'
             
-            # Пробуем разные PSM режимы для лучшего результата
-            # 6 - Uniform block of text
-            # 8 - Single word
-            # 7 - Single text line
-            # 11 - Sparse text (find as much text as possible)
-            # 4 - Single column of text
-            # 13 - Raw line (treat as single text line, no OSD)
-            psm_modes = [6, 11, 4, 7, 8, 13]  # Расширенный набор режимов
-            best_text = ""
-            best_confidence = 0
-            
-            for psm in psm_modes:
+            if self.blocks:
+                best_result = self.recognize_blocks()
+            elif self.variants:
+                best_result = self.recognize_variants()
+            else:
+                best_result = self.find_best_result(self.candidate_modes())
+            if self.cancelled:
+                return
+
+            raw_text = best_result.text if best_result else ""
+            
+            # Дополнительная очистка текста (более мягкая)
+            if raw_text:
+                # Сохраняем оригинальный текст для отладки
+                original_raw_text = raw_text
+                
+                # Нормализуем пробелы, но сохраняем переносы строк
+                raw_text = self.clean_text(raw_text)
+                
+                # Логирование для отладки (если включено в настройках)
+                if self.debug_console:
+                    print(f"🧾 OCR raw result ({len(original_raw_text)} chars):")
+                    print("-" * 50)
+                    print(original_raw_text[:500] + "..." if len(original_raw_text) > 500 else original_raw_text)
+                    print("-" * 50)
+                    print(f"📋 After cleaning ({len(raw_text)} chars):")
+                    print(raw_text[:500] + "..." if len(raw_text) > 500 else raw_text)
+                    print("=" * 50)
+            
+            self.progress_updated.emit(40)
+            if self.cancelled:
+                return
+            
+            if not raw_text:
+                self.result_ready.emit("", "", "text")
+                return
+                
+            content_type = self.classify_content(raw_text, self.interview_mode)
+            # Победа засчитывается, только если режимы соревновались: иначе первый в очереди
+            # выигрывал бы всегда и закреплял сам себя
+            if self.psm_stats is not None and self.shape_class is not None and best_result is not None \
+                    and best_result.psm is not None and self.modes_run > 1:
+                self.psm_stats.record(self.shape_class, content_type, best_result.psm, best_result.confidence)
+            
+            self.progress_updated.emit(60)
+            if self.cancelled:
+                return
+            
+            if self.use_openai and self.api_key:
                 try:
-                    config = f'--oem 3 --psm {psm}'
-                    
-                    # Получаем текст и данные о достоверности
-                    data = pytesseract.image_to_data(self.image, config=config, output_type=pytesseract.Output.DICT)
-                    text = pytesseract.image_to_string(self.image, config=config)
-                    
-                    # Вычисляем среднюю достоверность
-                    confidences = [int(conf) for conf in data['conf'] if int(conf) > 0]
-                    avg_confidence = sum(confidences) / len(confidences) if confidences else 0
-                    
-                    # Используем текст с наивысшей достоверностью
-                    if avg_confidence > best_confidence and text.strip():
-                        best_confidence = avg_confidence
-                        best_text = text.strip()
-                        
-                except Exception:
+                    processed_text = self.process_with_ai(raw_text, content_type, self.interview_mode)
+                    # Отмена посреди потока оставляет обрезанный ответ - его нельзя показывать и кешировать
+                    if self.cancelled:
+                        return
+                    self.progress_updated.emit(100)
+                    self.result_ready.emit(raw_text, processed_text, content_type)
+                except Exception as e:
+                    if self.cancelled:
+                        return
+                    self.error_occurred.emit(f"OpenAI Error: {str(e)}")
+                    self.result_ready.emit(raw_text, raw_text, content_type)
+            else:
+                self.progress_updated.emit(100)
+                self.result_ready.emit(raw_text, raw_text, content_type)
+                
+        except Exception as e:
+            self.error_occurred.emit(f"OCR Error: {str(e)}")
+
+
+class FrameSource(ABC):
+    """Источник кадров для потока захвата: open/read/close вызываются из этого потока"""
+    paced = True  # Читать не чаще интервала потока (иначе read сам ждет следующий кадр)
+
+    def open(self):
+        pass
+
+    @abstractmethod
+    def read(self):
+        """Следующий кадр или None"""
+
+    def skip(self):
+        """Пропустить кадр; False - источник не отвечает"""
+        return self.read() is not None
+
+    def close(self):
+        pass
+
+
+class VideoCaptureSource(FrameSource):
+    """Камера или файл через cv2.VideoCapture"""
+    def __init__(self, cap, paced=True):
+        self.cap = cap
+        self.paced = paced  # Камера отдает кадры в своем темпе; файл читается мгновенно
+
+    def read(self):
+        ret, frame = self.cap.read()
+        return frame if ret else None
+
+    def skip(self):
+        # grab() без retrieve() - кадр не декодируется
+        return self.cap.grab()
+
+    def close(self):
+        self.cap.release()
+
+
+class VideoSeekIndex:
+    """Время каждого кадра видеофайла; строится в фоне по пакетам контейнера (PyAV) или отдельным VideoCapture"""
+    decode_throttle = 1.0  # Без PyAV: пауза после grab() в долях его времени - не больше половины ядра
+
+    def __init__(self, path):
+        self.path = path
+        self.timestamps = []  # Миллисекунды кадра по номеру
+        self.complete = False
+        self.running = False
+        self.thread = None
+
+    def start(self):
+        self.running = True
+        self.thread = threading.Thread(target=self.build, name="video-seek-index", daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.running = False
+
+    def build(self):
+        if av_available:
+            try:
+                if self.build_from_packets():
+                    return
+            except Exception as e:
+                logging.getLogger(__name__).warning(f"Packet index failed for {self.path}, decoding instead: {e}")
+        self.build_by_decoding()
+
+    def build_from_packets(self):
+        """Метки времени из пакетов контейнера: файл только читается, кадры не декодируются"""
+        import av
+        with av.open(self.path) as container:
+            stream = container.streams.video[0]
+            time_base = float(stream.time_base)
+            start = stream.start_time or 0
+            timestamps = []
+            for packet in container.demux(stream):
+                if not self.running:
+                    return True
+                if packet.pts is None:
+                    if packet.size:
+                        return False  # Контейнер без меток времени - индексируем декодированием
+                    continue  # Пустой пакет сброса декодера в конце потока
+                timestamps.append((packet.pts - start) * time_base * 1000)
+        # Пакеты идут в порядке декодирования (B-кадры), а кадры - по времени показа
+        timestamps.sort()
+        if not timestamps:
+            return False
+        self.timestamps = timestamps
+        self.complete = self.running
+        return True
+
+    def build_by_decoding(self):
+        # grab() без retrieve() не переводит кадры в BGR, но бэкенд FFmpeg все равно декодирует каждый:
+        # это полное декодирование файла, поэтому поток уступает процессор воспроизведению
+        cap = cv2.VideoCapture(self.path)
+        try:
+            while self.running:
+                started = time.monotonic()
+                if not cap.grab():
+                    break
+                self.timestamps.append(cap.get(cv2.CAP_PROP_POS_MSEC))
+                time.sleep((time.monotonic() - started) * self.decode_throttle)
+            self.complete = self.running
+        finally:
+            cap.release()
+
+    @property
+    def frame_count(self):
+        return len(self.timestamps)
+
+    def frame_at(self, msec):
+        """Номер кадра на момент msec или None, если эта часть файла еще не проиндексирована"""
+        timestamps = self.timestamps
+        if not timestamps or (msec > timestamps[-1] and not self.complete):
+            return None
+        return max(0, bisect.bisect_right(timestamps, msec) - 1)
+
+    def time_of(self, frame_index):
+        if 0 <= frame_index < len(self.timestamps):
+            return self.timestamps[frame_index]
+        return None
+
+
+class VideoFileSource(FrameSource):
+    """Видеофайл по часам воспроизведения: кадры идут в темпе файла, опоздавшие пропускаются"""
+    max_grab_frames = 60  # Отставание больше - перемотка вместо пропуска по одному кадру
+
+    def __init__(self, cap, path):
+        self.cap = cap
+        fps = cap.get(cv2.CAP_PROP_FPS)
+        self.fps = fps if 0 < fps < 1000 else 30.0
+        self.estimated_frames = max(0, int(cap.get(cv2.CAP_PROP_FRAME_COUNT)))
+        self.index = VideoSeekIndex(path)
+        self.lock = threading.Lock()
+        self.paused = False
+        self.ended = False
+        self.anchor_msec = 0.0  # Время файла в момент anchor_time
+        self.anchor_time = time.monotonic()
+        self.pending_seek = None
+        self.next_frame = 0  # Номер кадра, который вернет cap.read()
+        self.position = 0  # Номер последнего показанного кадра
+
+    def open(self):
+        self.index.start()
+        with self.lock:
+            self.anchor_time = time.monotonic()
+
+    def close(self):
+        self.index.stop()
+        self.cap.release()
+
+    @property
+    def frame_count(self):
+        """Точное число кадров после индексации, до нее - оценка контейнера"""
+        if self.index.complete:
+            return self.index.frame_count
+        return max(self.estimated_frames, self.index.frame_count)
+
+    def frame_at(self, msec):
+        frame_index = self.index.frame_at(msec)
+        if frame_index is None:
+            # Допуск: time_of(k) -> frame_at должен вернуть k, а не k - 1 из-за округления
+            return int(msec * self.fps / 1000 + 1e-6)
+        last = self.index.frame_count - 1
+        if frame_index == last and self.index.complete and msec >= self.index.time_of(last) + 1000 / self.fps:
+            return last + 1  # Время последнего кадра прошло - конец файла
+        return frame_index
+
+    def time_of(self, frame_index):
+        msec = self.index.time_of(frame_index)
+        return msec if msec is not None else frame_index * 1000 / self.fps
+
+    def clock_msec(self):
+        """Текущее время воспроизведения"""
+        with self.lock:
+            if self.paused:
+                return self.anchor_msec
+            return self.anchor_msec + (time.monotonic() - self.anchor_time) * 1000
+
+    def seek(self, frame_index):
+        """Перейти к кадру; на паузе кадр тоже показывается"""
+        frame_index = max(0, frame_index)
+        msec = self.time_of(frame_index)
+        with self.lock:
+            self.pending_seek = frame_index
+            self.anchor_msec = msec
+            self.anchor_time = time.monotonic()
+            self.ended = False
+
+    def set_paused(self, paused):
+        msec = self.clock_msec()
+        with self.lock:
+            self.paused = paused
+            self.anchor_msec = msec
+            self.anchor_time = time.monotonic()
+
+    def read(self):
+        with self.lock:
+            seek, self.pending_seek = self.pending_seek, None
+        if seek is not None:
+            # Кадр перемотки показываем всегда, в том числе на паузе - его выделяют для OCR
+            self.cap.set(cv2.CAP_PROP_POS_FRAMES, seek)
+            self.next_frame = seek
+            target = seek
+        else:
+            target = self.frame_at(self.clock_msec())
+        if target < self.next_frame:
+            return None  # Следующий кадр по часам еще не наступил
+        if target - self.next_frame > self.max_grab_frames:
+            self.cap.set(cv2.CAP_PROP_POS_FRAMES, target)
+        else:
+            for _ in range(target - self.next_frame):
+                self.cap.grab()  # Пропущенные кадры не переводятся в BGR
+
+        ret, frame = self.cap.read()
+        if not ret:
+            # Конец файла: останавливаемся на последнем показанном кадре
+            with self.lock:
+                self.paused = True
+                self.ended = True
+                self.anchor_msec = self.time_of(self.position)
+            self.next_frame = target
+            return None
+        self.next_frame = target + 1
+        self.position = target
+        return frame
+
+
+class ScreenCaptureSource(FrameSource):
+    """Захват экрана через mss: один монитор или его часть, кадры остаются в BGRA"""
+    def __init__(self, monitor=1, region=None):
+        self.monitor = monitor  # 0 - все мониторы вместе, 1.. - отдельный монитор
+        self.region = region  # (x, y, w, h) относительно монитора или None - весь монитор
+        self.sct = None
+        self.area = None
+
+    @staticmethod
+    def parse_region(text):
+        """'x, y, w, h' -> [x, y, w, h]; пустая или неверная строка - весь монитор ([])"""
+        try:
+            values = [int(part) for part in text.replace(';', ',').split(',')]
+        except ValueError:
+            return []
+        if len(values) != 4 or values[0] < 0 or values[1] < 0 or values[2] <= 0 or values[3] <= 0:
+            return []
+        return values
+
+    @staticmethod
+    def grab_area(monitor, region=None):
+        """Прямоугольник mss для захвата: область, обрезанная по границам монитора"""
+        if not region:
+            return dict(monitor)
+        x, y, w, h = region
+        x, y = min(x, monitor['width'] - 1), min(y, monitor['height'] - 1)
+        return {
+            'left': monitor['left'] + x,
+            'top': monitor['top'] + y,
+            'width': max(1, min(w, monitor['width'] - x)),
+            'height': max(1, min(h, monitor['height'] - y)),
+        }
+
+    def open(self):
+        # Дескрипторы mss привязаны к потоку - создаем в потоке захвата
+        import mss
+        self.sct = mss.mss()
+        monitors = self.sct.monitors
+        index = self.monitor if 0 <= self.monitor < len(monitors) else min(1, len(monitors) - 1)
+        self.area = self.grab_area(monitors[index], self.region)
+
+    def read(self):
+        screenshot = self.sct.grab(self.area)
+        # BGRA без копии и cvtColor: превью рисует Format_RGB32, серый получается из BGRA напрямую
+        return np.frombuffer(screenshot.raw, dtype=np.uint8).reshape(screenshot.height, screenshot.width, 4)
+
+    def close(self):
+        if self.sct is not None:
+            self.sct.close()
+            self.sct = None
+
+
+class FrameChangeDetector:
+    """Изменился ли кадр: серая копия в половину разрешения против последнего измененного кадра"""
+    downscale = 2  # Символ мелкого текста занимает еще несколько пикселей копии
+    pixel_threshold = 16  # Правка одного символа дает десятки, шум видео после усреднения 2x2 - единицы
+    mean_threshold = 0.5  # Плавное изменение всего кадра (затемнение): сдвиг средней яркости
+
+    def __init__(self):
+        self.reference = None
+
+    def thumbnail(self, frame):
+        height, width = frame.shape[:2]
+        size = (max(1, width // self.downscale), max(1, height // self.downscale))
+        return to_gray(cv2.resize(frame, size, interpolation=cv2.INTER_AREA))
+
+    def changed(self, frame):
+        """Сравниваем с последним измененным кадром, а не с предыдущим - медленный дрейф тоже заметен"""
+        thumbnail = self.thumbnail(frame)
+        if self.reference is None or self.reference.shape != thumbnail.shape:
+            self.reference = thumbnail
+            return True
+        # Локальное изменение - по максимуму разницы, общее - по сдвигу среднего (шум в нем гасится)
+        if cv2.absdiff(thumbnail, self.reference).max() > self.pixel_threshold or \
+                abs(cv2.mean(thumbnail)[0] - cv2.mean(self.reference)[0]) > self.mean_threshold:
+            self.reference = thumbnail
+            return True
+        return False
+
+
+class FrameRingBuffer:
+    """Последние кадры захвата: поток захвата пишет, GUI берет самый свежий, старые вытесняются"""
+    def __init__(self, capacity=3):
+        self.frames = deque(maxlen=capacity)
+        self.frame_id = 0
+        self.changed_id = 0  # Номер последнего изменившегося кадра
+        self.lock = threading.Lock()
+
+    def push(self, frame, changed=True, preview=None):
+        """Хранится всегда самый новый кадр; changed только решает, нужна ли перерисовка"""
+        with self.lock:
+            self.frame_id += 1
+            if changed or not self.frames:
+                self.changed_id = self.frame_id
+            self.frames.append((frame, preview))
+
+    def latest(self):
+        """(номер, номер последнего изменения, кадр, превью) или (0, 0, None, None); кадры после записи не меняются"""
+        with self.lock:
+            if not self.frames:
+                return 0, 0, None, None
+            frame, preview = self.frames[-1]
+            return self.frame_id, self.changed_id, frame, preview
+
+    def clear(self):
+        with self.lock:
+            self.frames.clear()
+
+
+class FrameScheduler:
+    """Частота кадров по реальной стоимости захвата и отрисовки, движению в кадре и бюджету CPU"""
+    boost_seconds = 2.0  # Полная частота после выделения, панорамирования или зума
+    cost_alpha = 0.2
+    motion_rise = 0.5  # Движение появилось - разгоняемся почти сразу
+    motion_decay = 0.05  # Картинка замерла - замедляемся плавно
+
+    def __init__(self, cpu_budget=0.25, max_fps=30, min_fps=2):
+        self.cpu_budget = cpu_budget  # Доля одного ядра на захват и отрисовку видео
+        self.max_fps = max_fps
+        self.min_fps = min(min_fps, max_fps)
+        self.capture_cost = 0.0  # Секунды CPU на кадр в потоке захвата
+        self.render_cost = 0.0  # Секунды на показ изменившегося кадра в GUI потоке
+        self.motion = 1.0  # Доля изменившихся кадров; до статистики - полная частота
+        self.boost_until = 0.0
+
+    def record_capture(self, seconds):
+        self.capture_cost += self.cost_alpha * (seconds - self.capture_cost)
+
+    def record_render(self, seconds):
+        self.render_cost += self.cost_alpha * (seconds - self.render_cost)
+
+    def record_motion(self, changed):
+        alpha = self.motion_rise if changed else self.motion_decay
+        self.motion += alpha * (float(changed) - self.motion)
+
+    def boost(self):
+        self.boost_until = time.monotonic() + self.boost_seconds
+
+    @property
+    def boosted(self):
+        return time.monotonic() < self.boost_until
+
+    def interval(self):
+        """Секунды между кадрами"""
+        if self.boosted:
+            fps = self.max_fps
+        else:
+            fps = self.min_fps + self.motion * (self.max_fps - self.min_fps)
+        # Захват платит за каждый кадр, отрисовка - только за изменившиеся
+        frame_cost = self.capture_cost + self.motion * self.render_cost
+        budget_interval = frame_cost / self.cpu_budget if self.cpu_budget > 0 else 0.0
+        return min(1.0 / self.min_fps, max(1.0 / fps, budget_interval))
+
+
+class CaptureWorker(QThread):
+    """Захват кадров вне GUI потока: медленное чтение не блокирует выделение и перерисовку"""
+    error_occurred = pyqtSignal(str)
+
+    def __init__(self, source, frame_buffer, interval=0.033, change_detector=None):
+        super().__init__()
+        self.source = source
+        self.frame_buffer = frame_buffer
+        self.interval = interval  # Секунды между кадрами для источников с paced
+        self.change_detector = change_detector  # None - каждый кадр считается измененным
+        self.preview_view = (1.0, None)  # Превью для VideoWidget: (масштаб, часть кадра (x, y, w, h) или None - весь)
+        self.frame_cost = 0.0  # Время CPU потока на последний кадр: чтение, детектор, превью
+        self.running = False
+
+    def set_interval(self, interval):
+        self.interval = interval
+
+    def stop(self):
+        self.running = False
+
+    @staticmethod
+    def make_preview(frame, view):
+        """Видимая часть кадра в разрешении экрана: перерисовка зависит от размера окна, а не источника.
+        Возвращает (изображение, (x, y, w, h) в кадре) или None, если нужен весь кадр как есть"""
+        scale, rect = view
+        height, width = frame.shape[:2]
+        x, y, w, h = rect if rect is not None else (0, 0, width, height)
+        x, y = max(0, min(x, width - 1)), max(0, min(y, height - 1))
+        w, h = max(1, min(w, width - x)), max(1, min(h, height - y))
+        if scale >= 1.0 and (w, h) == (width, height):
+            return None
+        visible = frame[y:y + h, x:x + w]
+        if scale >= 1.0:
+            return np.ascontiguousarray(visible), (x, y, w, h)
+        size = (max(1, int(w * scale)), max(1, int(h * scale)))
+        return cv2.resize(visible, size, interpolation=cv2.INTER_AREA), (x, y, w, h)
+
+    def run(self):
+        self.running = True
+        try:
+            self.source.open()
+        except Exception as e:
+            self.error_occurred.emit(f"Capture error: {str(e)}")
+            return
+
+        failed = False
+        delivered = 0.0
+        last_preview = None
+        last_preview_view = None
+        try:
+            while self.running:
+                started = time.monotonic()
+                if not self.source.paced and started - delivered < self.interval:
+                    # Камера отдает кадры чаще, чем нужно планировщику: лишние пропускаем без декодирования
+                    if not self.source.skip():
+                        time.sleep(self.interval)
                     continue
-            
-            # Если ни один режим не дал хорошего результата, используем базовый
-            if not best_text:
-                try:
-                    raw_text = pytesseract.image_to_string(self.image, config='--oem 3 --psm 6')
-                except Exception:
-                    raw_text = pytesseract.image_to_string(self.image)
-            else:
-                raw_text = best_text
-                
-            raw_text = raw_text.strip()
-            
-            # Дополнительная очистка текста (более мягкая)
-            if raw_text:
-                # Сохраняем оригинальный текст для отладки
-                original_raw_text = raw_text
-                
-                # Нормализуем пробелы, но сохраняем переносы строк
-                lines = raw_text.split('\n')
-                cleaned_lines = []
-                for line in lines:
-                    # Убираем лишние пробелы в строке, но сохраняем структуру
-                    cleaned_line = ' '.join(line.split())
-                    if cleaned_line:  # Только непустые строки
-                        cleaned_lines.append(cleaned_line)
-                
-                raw_text = '\n'.join(cleaned_lines)
-                
-                # Логирование для отладки (если включено в настройках)
-                if self.debug_console:
-                    print(f"🧾 OCR raw result ({len(original_raw_text)} chars):")
-                    print("-" * 50)
-                    print(original_raw_text[:500] + "..." if len(original_raw_text) > 500 else original_raw_text)
-                    print("-" * 50)
-                    print(f"📋 After cleaning ({len(raw_text)} chars):")
-                    print(raw_text[:500] + "..." if len(raw_text) > 500 else raw_text)
-                    print("=" * 50)
-            
-            self.progress_updated.emit(40)
-            if self.cancelled:
-                return
-            
-            if not raw_text:
-                self.result_ready.emit("", "", "text")
-                return
-                
-            content_type = self.classify_content(raw_text, self.interview_mode)
-            
-            self.progress_updated.emit(60)
-            if self.cancelled:
-                return
-            
-            if self.use_openai and self.api_key:
+                delivered = started
+                cpu_started = time.thread_time()
                 try:
-                    processed_text = self.process_with_ai(raw_text, content_type, self.interview_mode)
-                    self.progress_updated.emit(100)
-                    self.result_ready.emit(raw_text, processed_text, content_type)
+                    frame = self.source.read()
+                    error = None
                 except Exception as e:
-                    self.error_occurred.emit(f"OpenAI Error: {str(e)}")
-                    self.result_ready.emit(raw_text, raw_text, content_type)
-            else:
-                self.progress_updated.emit(100)
-                self.result_ready.emit(raw_text, raw_text, content_type)
-                
-        except Exception as e:
-            self.error_occurred.emit(f"OCR Error: {str(e)}")
+                    frame = None
+                    error = e
+                if not self.running:
+                    break  # Пока висело чтение, источник сменили - кадр в общий буфер не кладем
+                if frame is not None:
+                    failed = False
+                    detector = self.change_detector
+                    changed = detector is None or detector.changed(frame)
+                    # Полный кадр хранится ссылкой для OCR; превью считается для изменившихся кадров
+                    # и после смены зума или видимой части, неизменный кадр показывается прежним превью
+                    view = self.preview_view
+                    rescaled = view != last_preview_view
+                    if changed or rescaled or last_preview is None:
+                        last_preview_view = view
+                        last_preview = self.make_preview(frame, view)
+                    # Новое превью того же содержимого тоже нужно перерисовать
+                    self.frame_buffer.push(frame, changed or rescaled, last_preview)
+                    self.frame_cost = time.thread_time() - cpu_started
+                elif error is not None and not failed:
+                    # Сообщаем один раз на серию ошибок
+                    failed = True
+                    self.error_occurred.emit(f"Capture error: {str(error)}")
+
+                if self.source.paced or frame is None:
+                    remaining = self.interval - (time.monotonic() - started)
+                    if remaining > 0:
+                        time.sleep(remaining)
+        finally:
+            self.source.close()
 
 
 class AudioCaptureWorker(QThread):
@@ -994,6 +2928,19 @@ class SettingsDialog(QDialog):
         file_btn.clicked.connect(self.select_video_file)
         video_layout.addRow("", file_btn)
         
+        # Захват экрана: монитор и область
+        self.screen_monitor_spin = QSpinBox()
+        self.screen_monitor_spin.setRange(0, 16)
+        self.screen_monitor_spin.setValue(self.settings.get('screen_monitor', 1))
+        self.screen_monitor_spin.setToolTip("Монитор для захвата экрана: 1 - основной, 0 - все мониторы вместе")
+        video_layout.addRow("Монитор:", self.screen_monitor_spin)
+        
+        self.screen_region_input = QLineEdit()
+        self.screen_region_input.setText(', '.join(str(v) for v in self.settings.get('screen_region', [])))
+        self.screen_region_input.setPlaceholderText("x, y, ширина, высота (пусто - весь монитор)")
+        self.screen_region_input.setToolTip("Захватывать только эту часть монитора - меньше данных на каждый кадр")
+        video_layout.addRow("Область экрана:", self.screen_region_input)
+        
         video_group.setLayout(video_layout)
         layout.addRow(video_group)
         
@@ -1020,16 +2967,149 @@ class SettingsDialog(QDialog):
         self.scale_factor_spin.setToolTip("Увеличение изображения для лучшего распознавания (1-5x)")
         quality_layout.addRow("Увеличение изображения:", self.scale_factor_spin)
         
+        self.auto_scale_checkbox = QCheckBox("Подбирать увеличение по высоте текста")
+        self.auto_scale_checkbox.setChecked(self.settings.get('auto_scale', True))
+        self.auto_scale_checkbox.setToolTip("Крупный текст не увеличивается; значение выше - максимальное увеличение")
+        quality_layout.addRow(self.auto_scale_checkbox)
+        
+        self.preprocessing_threads_spin = QSpinBox()
+        self.preprocessing_threads_spin.setRange(0, 64)
+        self.preprocessing_threads_spin.setValue(self.settings.get('preprocessing_threads', 0))
+        self.preprocessing_threads_spin.setSpecialValueText("Авто")
+        self.preprocessing_threads_spin.setToolTip("Потоки для предобработки больших областей полосами (Авто - по числу ядер)")
+        quality_layout.addRow("Потоки предобработки:", self.preprocessing_threads_spin)
+        
+        self.ocr_ensemble_checkbox = QCheckBox("Ансамбль вариантов предобработки")
+        self.ocr_ensemble_checkbox.setChecked(self.settings.get('ocr_ensemble', False))
+        self.ocr_ensemble_checkbox.setToolTip("Серое, adaptive, OTSU и CLAHE распознаются параллельно, для каждого слова берется самое достоверное прочтение")
+        quality_layout.addRow(self.ocr_ensemble_checkbox)
+        
         self.debug_images_checkbox = QCheckBox("Сохранять отладочные изображения")
         self.debug_images_checkbox.setChecked(self.settings.get('debug_images', False))
         self.debug_images_checkbox.setToolTip("Сохранять оригинальные и обработанные изображения в папку debug_images/")
         quality_layout.addRow(self.debug_images_checkbox)
         
+        self.debug_format_combo = QComboBox()
+        self.debug_format_combo.addItems(DebugImageWriter.formats)
+        self.debug_format_combo.setCurrentText(self.settings.get('debug_image_format', 'png'))
+        quality_layout.addRow("Формат отладочных изображений:", self.debug_format_combo)
+        
+        self.debug_compression_spin = QSpinBox()
+        self.debug_compression_spin.setRange(0, 9)
+        self.debug_compression_spin.setValue(self.settings.get('debug_image_compression', 1))
+        self.debug_compression_spin.setToolTip("PNG: уровень сжатия 0-9; JPEG/WebP: качество 100 - 10 × значение")
+        quality_layout.addRow("Сжатие отладочных изображений:", self.debug_compression_spin)
+        
         self.high_quality_checkbox = QCheckBox("Режим высокого качества (медленнее)")
         self.high_quality_checkbox.setChecked(self.settings.get('high_quality_mode', False))
         self.high_quality_checkbox.setToolTip("Использовать дополнительные алгоритмы для лучшего качества")
         quality_layout.addRow(self.high_quality_checkbox)
         
+        self.adaptive_preprocessing_checkbox = QCheckBox("Пропускать ненужные стадии предобработки")
+        self.adaptive_preprocessing_checkbox.setChecked(self.settings.get('adaptive_preprocessing', True))
+        self.adaptive_preprocessing_checkbox.setToolTip("По оценке шума, контраста и толщины штрихов: четкий текст с экрана идет в OCR почти без обработки")
+        quality_layout.addRow(self.adaptive_preprocessing_checkbox)
+        
+        self.denoise_first_checkbox = QCheckBox("Шумоподавление до увеличения")
+        self.denoise_first_checkbox.setChecked(self.settings.get('denoise_before_upscale', False))
+        self.denoise_first_checkbox.setToolTip("Шумоподавление на исходном разрешении - в scale_factor² раз меньше пикселей (сравнение: benchmark_preprocessing.py)")
+        quality_layout.addRow(self.denoise_first_checkbox)
+        
+        self.denoise_method_combo = QComboBox()
+        self.denoise_method_combo.addItems(PreprocessingPipeline.denoise_methods)
+        self.denoise_method_combo.setCurrentText(self.settings.get('denoise_method', 'nlmeans'))
+        self.denoise_method_combo.setToolTip("nlmeans - Non-Local Means (медленно), bilateral - сохраняющий края фильтр (быстро)")
+        quality_layout.addRow("Метод шумоподавления:", self.denoise_method_combo)
+        
+        self.binarization_combo = QComboBox()
+        self.binarization_combo.addItems(('auto',) + PreprocessingPipeline.binarization_methods)
+        self.binarization_combo.setCurrentText(self.settings.get('binarization_method', 'auto'))
+        self.binarization_combo.setToolTip("auto - метод выбирается по уменьшенной копии изображения")
+        quality_layout.addRow("Бинаризация:", self.binarization_combo)
+        
+        self.parallel_psm_checkbox = QCheckBox("Параллельные PSM проходы (все ядра CPU)")
+        self.parallel_psm_checkbox.setChecked(self.settings.get('parallel_psm', False))
+        self.parallel_psm_checkbox.setToolTip("Запускать режимы Tesseract одновременно в пуле процессов")
+        quality_layout.addRow(self.parallel_psm_checkbox)
+        
+        self.confidence_threshold_spin = QSpinBox()
+        self.confidence_threshold_spin.setRange(0, 100)
+        self.confidence_threshold_spin.setValue(self.settings.get('psm_confidence_threshold', 100))
+        self.confidence_threshold_spin.setToolTip("Остановить перебор PSM режимов, когда достоверность выше порога (100 - перебирать все)")
+        quality_layout.addRow("Порог достоверности OCR:", self.confidence_threshold_spin)
+        
+        self.ocr_cache_size_spin = QSpinBox()
+        self.ocr_cache_size_spin.setRange(0, 10000)
+        self.ocr_cache_size_spin.setValue(self.settings.get('ocr_cache_size', 128))
+        self.ocr_cache_size_spin.setToolTip("Сколько результатов OCR хранить в памяти для повторных выделений (0 - без кеша)")
+        quality_layout.addRow("Размер кеша OCR:", self.ocr_cache_size_spin)
+        
+        self.disk_cache_checkbox = QCheckBox("Сохранять кеш OCR на диск")
+        self.disk_cache_checkbox.setChecked(self.settings.get('ocr_disk_cache', False))
+        self.disk_cache_checkbox.setToolTip("Результаты OCR сохраняются в папку ocr_cache/ и переживают перезапуск")
+        quality_layout.addRow(self.disk_cache_checkbox)
+        
+        self.near_duplicate_checkbox = QCheckBox("Узнавать почти одинаковые выделения")
+        self.near_duplicate_checkbox.setChecked(self.settings.get('near_duplicate_detection', False))
+        self.near_duplicate_checkbox.setToolTip("Повторное выделение того же текста (с шумом видео) берет готовый OCR и ответ GPT")
+        quality_layout.addRow(self.near_duplicate_checkbox)
+        
+        self.phash_distance_spin = QSpinBox()
+        self.phash_distance_spin.setRange(0, 32)
+        self.phash_distance_spin.setValue(self.settings.get('phash_max_distance', 10))
+        self.phash_distance_spin.setToolTip("Максимальное расстояние Хэмминга между pHash выделений (из 64 бит)")
+        quality_layout.addRow("Допуск pHash:", self.phash_distance_spin)
+        
+        self.text_regions_checkbox = QCheckBox("Распознавать только текстовые блоки больших областей")
+        self.text_regions_checkbox.setChecked(self.settings.get('text_region_detection', True))
+        self.text_regions_checkbox.setToolTip("Пустые поля и элементы интерфейса не увеличиваются и не распознаются")
+        quality_layout.addRow(self.text_regions_checkbox)
+        
+        self.watch_settle_spin = QSpinBox()
+        self.watch_settle_spin.setRange(1, 60)
+        self.watch_settle_spin.setValue(self.settings.get('watch_settle_frames', 5))
+        self.watch_settle_spin.setToolTip("Сколько кадров закрепленная область должна не меняться перед OCR")
+        quality_layout.addRow("Стабилизация области (кадры):", self.watch_settle_spin)
+        
+        self.watch_threshold_spin = QSpinBox()
+        self.watch_threshold_spin.setRange(1, 128)
+        self.watch_threshold_spin.setValue(self.settings.get('watch_change_threshold', 24))
+        self.watch_threshold_spin.setToolTip("Разница яркости пикселя (в уменьшенной копии области), которая считается изменением")
+        quality_layout.addRow("Порог изменения области:", self.watch_threshold_spin)
+        
+        self.skip_static_checkbox = QCheckBox("Не перерисовывать статичное видео")
+        self.skip_static_checkbox.setChecked(self.settings.get('skip_static_frames', True))
+        self.skip_static_checkbox.setToolTip("Кадр без изменений (по уменьшенной копии) не перерисовывается и не проверяется в закрепленных областях")
+        quality_layout.addRow(self.skip_static_checkbox)
+        
+        self.preview_downscale_checkbox = QCheckBox("Превью в разрешении окна")
+        self.preview_downscale_checkbox.setChecked(self.settings.get('preview_downscale', True))
+        self.preview_downscale_checkbox.setToolTip("Поток захвата уменьшает кадр для показа; OCR берет полный кадр")
+        quality_layout.addRow(self.preview_downscale_checkbox)
+        
+        self.frame_budget_spin = QSpinBox()
+        self.frame_budget_spin.setRange(5, 100)
+        self.frame_budget_spin.setSuffix("%")
+        self.frame_budget_spin.setValue(self.settings.get('frame_cpu_budget', 25))
+        self.frame_budget_spin.setToolTip("Доля одного ядра CPU на захват и показ видео; частота кадров подстраивается под нее и движение в кадре")
+        quality_layout.addRow("Бюджет CPU видео:", self.frame_budget_spin)
+        
+        self.max_fps_spin = QSpinBox()
+        self.max_fps_spin.setRange(5, 60)
+        self.max_fps_spin.setValue(self.settings.get('max_fps', 30))
+        self.max_fps_spin.setToolTip("Частота кадров при движении и во время выделения")
+        quality_layout.addRow("Макс. FPS:", self.max_fps_spin)
+        
+        self.incremental_ocr_checkbox = QCheckBox("Распознавать заново только изменившиеся строки")
+        self.incremental_ocr_checkbox.setChecked(self.settings.get('incremental_line_ocr', True))
+        self.incremental_ocr_checkbox.setToolTip("Для закрепленных областей: неизменные строки берут текст с прошлого прохода")
+        quality_layout.addRow(self.incremental_ocr_checkbox)
+        
+        self.stream_results_checkbox = QCheckBox("Показывать промежуточный результат")
+        self.stream_results_checkbox.setChecked(self.settings.get('stream_results', True))
+        self.stream_results_checkbox.setToolTip("Черновик OCR сразу после первого прохода, ответ GPT - по мере генерации")
+        quality_layout.addRow(self.stream_results_checkbox)
+        
         self.debug_console_checkbox = QCheckBox("Отладочный вывод в консоль")
         self.debug_console_checkbox.setChecked(self.settings.get('debug_console', False))
         self.debug_console_checkbox.setToolTip("Выводить результаты OCR в консоль для отладки")
@@ -1137,12 +3217,38 @@ class SettingsDialog(QDialog):
             'model': self.model_combo.currentText(),
             'video_source': self.get_selected_video_source(),
             'video_file_path': self.video_file_input.text(),
+            'screen_monitor': self.screen_monitor_spin.value(),
+            'screen_region': ScreenCaptureSource.parse_region(self.screen_region_input.text()),
             'ocr_language': self.language_combo.currentText(),
             'preprocessing': self.preprocessing_checkbox.isChecked(),
             'scale_factor': self.scale_factor_spin.value(),
+            'auto_scale': self.auto_scale_checkbox.isChecked(),
+            'preprocessing_threads': self.preprocessing_threads_spin.value(),
+            'ocr_ensemble': self.ocr_ensemble_checkbox.isChecked(),
             'debug_images': self.debug_images_checkbox.isChecked(),
+            'debug_image_format': self.debug_format_combo.currentText(),
+            'debug_image_compression': self.debug_compression_spin.value(),
             'debug_console': self.debug_console_checkbox.isChecked(),
             'high_quality_mode': self.high_quality_checkbox.isChecked(),
+            'adaptive_preprocessing': self.adaptive_preprocessing_checkbox.isChecked(),
+            'denoise_before_upscale': self.denoise_first_checkbox.isChecked(),
+            'denoise_method': self.denoise_method_combo.currentText(),
+            'binarization_method': self.binarization_combo.currentText(),
+            'parallel_psm': self.parallel_psm_checkbox.isChecked(),
+            'psm_confidence_threshold': self.confidence_threshold_spin.value(),
+            'ocr_cache_size': self.ocr_cache_size_spin.value(),
+            'ocr_disk_cache': self.disk_cache_checkbox.isChecked(),
+            'near_duplicate_detection': self.near_duplicate_checkbox.isChecked(),
+            'phash_max_distance': self.phash_distance_spin.value(),
+            'text_region_detection': self.text_regions_checkbox.isChecked(),
+            'watch_settle_frames': self.watch_settle_spin.value(),
+            'watch_change_threshold': self.watch_threshold_spin.value(),
+            'skip_static_frames': self.skip_static_checkbox.isChecked(),
+            'preview_downscale': self.preview_downscale_checkbox.isChecked(),
+            'frame_cpu_budget': self.frame_budget_spin.value(),
+            'max_fps': self.max_fps_spin.value(),
+            'incremental_line_ocr': self.incremental_ocr_checkbox.isChecked(),
+            'stream_results': self.stream_results_checkbox.isChecked(),
             'interview_mode': self.interview_mode_checkbox.isChecked(),
             'user_name': self.user_name_input.text(),
             'whisper_language': self.whisper_language_combo.currentText(),
@@ -1188,11 +3294,132 @@ class SettingsDialog(QDialog):
         """Применить выбранный источник видео"""
         if self.parent():
             source_id = self.get_selected_video_source()
+            if source_id == -1:
+                # Монитор и область нужны захвату экрана сразу, до сохранения настроек
+                self.parent().settings['screen_monitor'] = self.screen_monitor_spin.value()
+                self.parent().settings['screen_region'] = ScreenCaptureSource.parse_region(self.screen_region_input.text())
             self.parent().setup_video_capture(source_id)
 
 
+class LineStripCache:
+    """Строки закрепленной области с прошлого прохода: подпись полосы -> результат OCR"""
+    pixel_threshold = 24  # Как у RegionWatcher: правка символа в половинном разрешении - десятки, шум - единицы
+    strip_padding = 4
+
+    def __init__(self):
+        self.entries = []  # [(y, signature, OCRResult)], y - верх полосы в координатах области
+
+    @classmethod
+    def line_strips(cls, region, detector):
+        """Горизонтальные полосы (y1, y2) во всю ширину области, по одной на строку текста"""
+        height = region.shape[0]
+        strips = []
+        for _, y, _, h in sorted(detector.detect_lines(region), key=lambda rect: rect[1]):
+            y1, y2 = max(0, y - cls.strip_padding), min(height, y + h + cls.strip_padding)
+            if strips and y1 < strips[-1][1]:
+                strips[-1] = (strips[-1][0], max(strips[-1][1], y2))
+            else:
+                strips.append((y1, y2))
+        return strips
+
+    @staticmethod
+    def signature(strip):
+        """Серая копия полосы в исходном разрешении - полоса может быть видом на кадр"""
+        return np.array(to_gray(strip))
+
+    @staticmethod
+    def half_size(gray):
+        height, width = gray.shape
+        return cv2.resize(gray, (max(1, width // 2), max(1, height // 2)), interpolation=cv2.INTER_AREA)
+
+    def same_strip(self, first_y, first, second_y, second):
+        """Та же строка на том же месте области: сравниваем общие ряды пикселей по максимуму разницы"""
+        if first.shape[1] != second.shape[1]:
+            return False
+        if abs(first_y - second_y) > self.strip_padding or abs(first.shape[0] - second.shape[0]) > self.strip_padding:
+            return False
+        # Область закреплена, поэтому полосы выровнены по своим координатам без поиска сдвига
+        top = max(first_y, second_y)
+        bottom = min(first_y + first.shape[0], second_y + second.shape[0])
+        if bottom - top < 2:
+            return False
+        first_rows = self.half_size(first[top - first_y:bottom - first_y])
+        second_rows = self.half_size(second[top - second_y:bottom - second_y])
+        return cv2.absdiff(first_rows, second_rows).max() <= self.pixel_threshold
+
+    def lookup(self, y, signature):
+        """Результат OCR той же строки с прошлого прохода (полоса на том же месте и той же высоты)"""
+        for cached_y, cached_signature, result in self.entries:
+            if self.same_strip(y, signature, cached_y, cached_signature):
+                return result
+        return None
+
+    def replace(self, entries):
+        self.entries = [(y, signature, result) for y, signature, result in entries if result is not None]
+
+
+class RegionWatcher:
+    """Закрепленная область кадра: дешевая проверка изменений перед повторным OCR"""
+    downscale = 2  # Как у FrameChangeDetector: правка одного символа остается видна в копии
+    mean_threshold = 0.5  # Плавное изменение всей области: сдвиг средней яркости
+
+    def __init__(self, rect, change_threshold=24, settle_frames=5):
+        self.rect = rect  # (x, y, w, h) в координатах кадра
+        self.change_threshold = change_threshold  # Максимальная разница яркости пикселя уменьшенной копии
+        self.settle_frames = settle_frames
+        self.last_signature = None
+        self.ocr_signature = None  # Содержимое области на момент последнего OCR
+        self.stable_frames = 0
+        self.dirty = True  # Первый OCR - как только картинка успокоится
+        self.last_content_type = None
+        self.strip_cache = LineStripCache()
+
+    def crop(self, frame):
+        x, y, w, h = self.rect
+        return frame[y:y + h, x:x + w]
+
+    def signature(self, frame):
+        """Серая копия области в половину разрешения - размер по области, а не фиксированный"""
+        region = self.crop(frame)
+        height, width = region.shape[:2]
+        size = (max(1, width // self.downscale), max(1, height // self.downscale))
+        return to_gray(cv2.resize(region, size, interpolation=cv2.INTER_AREA))
+
+    def changed(self, first, second):
+        if first is None or second is None or first.shape != second.shape:
+            return True
+        # Локальная правка - по максимуму разницы, изменение всей области - по сдвигу среднего
+        return cv2.absdiff(first, second).max() > self.change_threshold or \
+            abs(cv2.mean(first)[0] - cv2.mean(second)[0]) > self.mean_threshold
+
+    def update(self, frame):
+        """Обновить состояние по новому кадру"""
+        signature = self.signature(frame)
+        if self.changed(signature, self.last_signature):
+            self.stable_frames = 0
+            self.dirty = True
+        else:
+            self.stable_frames += 1
+        self.last_signature = signature
+
+    def ready(self):
+        """Область изменилась и уже N кадров не меняется"""
+        if not self.dirty or self.stable_frames < self.settle_frames:
+            return False
+        if not self.changed(self.last_signature, self.ocr_signature):
+            # Вернулись к уже распознанному содержимому
+            self.dirty = False
+            return False
+        return True
+
+    def mark_processed(self):
+        self.ocr_signature = self.last_signature
+        self.dirty = False
+
+
 class VideoWidget(QLabel):
     selectionMade = pyqtSignal(QRectF)
+    interactionStarted = pyqtSignal()  # Выделение, панорамирование или зум - нужна полная частота кадров
     
     def __init__(self):
         super().__init__()
@@ -1211,6 +3438,20 @@ class VideoWidget(QLabel):
         
         self.video_size = None
         self.widget_size = None
+        self.watched_rects = []  # (x, y, w, h) закрепленных областей в координатах кадра
+        
+        # Кэш отрисовки: QImage поверх кадра и превью, их pixmap и масштабированный pixmap
+        self.frame = None
+        self.preview = None
+        self.frame_image = None
+        self.preview_image = None
+        self.preview_rect = None  # (x, y, w, h) части кадра, которую покрывает превью
+        self.frame_pixmap = None
+        self.preview_pixmap = None
+        self.scaled_pixmap = None
+        self.scaled_key = None
+        self.max_cached_pixels = 16 * 1024 * 1024
+        self.paint_cost = 0.0  # Секунды на последнюю отрисовку кадра
         
         # Показывать подсказки
         self.setToolTip("Левая кнопка: выделение области для OCR\nПравая кнопка: панорамирование\nКолесико: зум")
@@ -1222,37 +3463,133 @@ class VideoWidget(QLabel):
             }
         """)
         
-    def set_frame(self, frame):
-        height, width, channel = frame.shape
-        bytes_per_line = 3 * width
-        q_image = QImage(frame.data, width, height, bytes_per_line, QImage.Format_RGB888).rgbSwapped()
-        
-        self.video_size = q_image.size()
+    @staticmethod
+    def image_for(array):
+        """QImage поверх массива BGR/BGRA без копии данных"""
+        height, width = array.shape[:2]
+        if array.ndim == 3 and array.shape[2] == 4:
+            # BGRA захвата экрана в памяти совпадает с Format_RGB32
+            return QImage(array.data, width, height, array.strides[0], QImage.Format_RGB32)
+        if hasattr(QImage, 'Format_BGR888'):
+            # Qt >= 5.14 рисует BGR без rgbSwapped()
+            return QImage(array.data, width, height, array.strides[0], QImage.Format_BGR888)
+        return QImage(array.data, width, height, array.strides[0], QImage.Format_RGB888).rgbSwapped()
+        
+    def set_frame(self, frame, preview=None):
+        """Новый кадр и превью его видимой части (изображение, (x, y, w, h)); отрисовка в paintEvent"""
+        if not frame.flags['C_CONTIGUOUS']:
+            frame = np.ascontiguousarray(frame)
+        # Кадры держим ссылкой: QImage не копирует данные
+        self.frame = frame
+        self.preview, self.preview_rect = preview if preview is not None else (None, None)
+        self.frame_image = self.image_for(frame)
+        self.preview_image = self.image_for(self.preview) if self.preview is not None else None
+        # Координаты выделения всегда в полном кадре
+        self.video_size = self.frame_image.size()
         self.widget_size = self.size()
-        
-        pixmap = QPixmap.fromImage(q_image)
-        
-        scaled_width = int(width * self.zoom_factor)
-        scaled_height = int(height * self.zoom_factor)
-        scaled_pixmap = pixmap.scaled(scaled_width, scaled_height, Qt.KeepAspectRatio, Qt.SmoothTransformation)
-        
-        final_pixmap = QPixmap(self.size())
-        final_pixmap.fill(Qt.black)
-        
-        painter = QPainter(final_pixmap)
-        x = int((self.width() - scaled_width) / 2 + self.pan_offset.x())
-        y = int((self.height() - scaled_height) / 2 + self.pan_offset.y())
-        painter.drawPixmap(x, y, scaled_pixmap)
+        self.frame_pixmap = None
+        self.preview_pixmap = None
+        self.scaled_pixmap = None
+        self.update()
+        
+    def visible_video_rect(self):
+        """Видимая в виджете часть кадра (x, y, w, h) в координатах кадра или None"""
+        if not self.video_size:
+            return None
+        video_width, video_height = self.video_size.width(), self.video_size.height()
+        x_offset = (self.width() - video_width * self.zoom_factor) / 2 + self.pan_offset.x()
+        y_offset = (self.height() - video_height * self.zoom_factor) / 2 + self.pan_offset.y()
+        x1 = max(0, int(np.floor(-x_offset / self.zoom_factor)))
+        y1 = max(0, int(np.floor(-y_offset / self.zoom_factor)))
+        x2 = min(video_width, int(np.ceil((self.width() - x_offset) / self.zoom_factor)))
+        y2 = min(video_height, int(np.ceil((self.height() - y_offset) / self.zoom_factor)))
+        if x2 <= x1 or y2 <= y1:
+            return None
+        return (x1, y1, x2 - x1, y2 - y1)
+        
+    def preview_covers_view(self):
+        """Превью покрывает видимую часть кадра и его разрешения хватает для текущего зума"""
+        if self.preview_image is None:
+            return False
+        x, y, w, h = self.preview_rect
+        visible = self.visible_video_rect()
+        if visible is not None:
+            vx, vy, vw, vh = visible
+            if vx < x or vy < y or vx + vw > x + w or vy + vh > y + h:
+                return False
+        return self.preview_image.width() >= int(w * min(1.0, self.zoom_factor))
+        
+    def display_pixmap(self):
+        """Превью и покрытая им часть кадра, если оно подходит для текущего вида, иначе полный кадр"""
+        if self.preview_covers_view():
+            if self.preview_pixmap is None:
+                self.preview_pixmap = QPixmap.fromImage(self.preview_image)
+            return self.preview_pixmap, self.preview_rect
+        if self.frame_pixmap is None:
+            self.frame_pixmap = QPixmap.fromImage(self.frame_image)
+        return self.frame_pixmap, (0, 0, self.video_size.width(), self.video_size.height())
+        
+    def get_scaled_pixmap(self, source, scaled_width, scaled_height):
+        """Масштабированный кадр; кэшируется до смены кадра, зума или размера виджета"""
+        if source.width() == scaled_width and source.height() == scaled_height:
+            return source  # Превью уже в размере экрана
+        key = (scaled_width, scaled_height, self.width(), self.height(), source.cacheKey())
+        if self.scaled_pixmap is None or self.scaled_key != key:
+            self.scaled_pixmap = source.scaled(scaled_width, scaled_height,
+                                               Qt.KeepAspectRatio, Qt.SmoothTransformation)
+            self.scaled_key = key
+        return self.scaled_pixmap
+        
+    def paintEvent(self, event):
+        super().paintEvent(event)
+        if self.frame_image is None:
+            return
+            
+        started = time.perf_counter()
+        painter = QPainter(self)
+        painter.setClipRect(self.contentsRect())
+        painter.fillRect(self.contentsRect(), Qt.black)
+        
+        # Рисуем ту часть кадра, которую покрывает источник: превью видимой части или весь кадр
+        source, source_rect = self.display_pixmap()
+        target = self.get_widget_rect_from_video(source_rect)
+        scaled_width = int(target.width())
+        scaled_height = int(target.height())
+        if scaled_width * scaled_height <= self.max_cached_pixels:
+            painter.drawPixmap(int(target.x()), int(target.y()),
+                               self.get_scaled_pixmap(source, scaled_width, scaled_height))
+        else:
+            # Сильный зум: масштабируем только видимую часть вместо огромного pixmap
+            painter.setRenderHint(QPainter.SmoothPixmapTransform)
+            painter.drawPixmap(target, source, QRectF(source.rect()))
         
         if not self.selection_rect.isEmpty():
             painter.setPen(QPen(QColor(0, 255, 0), 3))
             painter.drawRect(self.selection_rect.toRect())
+            
+        # Закрепленные области наблюдения
+        painter.setPen(QPen(QColor(255, 165, 0), 2, Qt.DashLine))
+        for index, rect in enumerate(self.watched_rects, 1):
+            widget_rect = self.get_widget_rect_from_video(rect)
+            if widget_rect is not None:
+                painter.drawRect(widget_rect.toRect())
+                painter.drawText(widget_rect.topLeft() + QPointF(4, 14), f"📌{index}")
         
         painter.end()
+        self.paint_cost = time.perf_counter() - started
+        
+    def set_watched_rects(self, rects):
+        self.watched_rects = rects
+        self.update()
         
-        self.setPixmap(final_pixmap)
+    def reset_view(self):
+        self.zoom_factor = 1.0
+        self.pan_offset = QPointF(0, 0)
+        self.selection_rect = QRectF()
+        self.update()
         
     def wheelEvent(self, event):
+        self.interactionStarted.emit()
         old_zoom = self.zoom_factor
         
         if event.angleDelta().y() > 0:
@@ -1273,8 +3610,11 @@ class VideoWidget(QLabel):
         
         self.pan_offset.setX(self.pan_offset.x() + offset_x * (1 - zoom_change))
         self.pan_offset.setY(self.pan_offset.y() + offset_y * (1 - zoom_change))
+        self.update()
         
     def mousePressEvent(self, event):
+        if event.button() in (Qt.RightButton, Qt.LeftButton):
+            self.interactionStarted.emit()
         if event.button() == Qt.RightButton:
             self.is_panning = True
             self.last_mouse_pos = event.pos()
@@ -1284,15 +3624,18 @@ class VideoWidget(QLabel):
             self.selection_start = event.pos()
             self.selection_end = event.pos()
             self.selection_rect = QRectF()
+            self.update()
             
     def mouseMoveEvent(self, event):
         if self.is_panning:
             delta = event.pos() - self.last_mouse_pos
             self.pan_offset += delta
             self.last_mouse_pos = event.pos()
+            self.update()
         elif self.is_selecting:
             self.selection_end = event.pos()
             self.selection_rect = QRectF(self.selection_start, self.selection_end).normalized()
+            self.update()
             
     def mouseReleaseEvent(self, event):
         if event.button() == Qt.RightButton:
@@ -1317,6 +3660,21 @@ class VideoWidget(QLabel):
         video_y = (widget_point.y() - y_offset) / self.zoom_factor
         
         return QPointF(video_x, video_y)
+        
+    def get_widget_rect_from_video(self, rect):
+        """Прямоугольник кадра (x, y, w, h) в координатах виджета"""
+        if not self.video_size:
+            return None
+            
+        x, y, w, h = rect
+        scaled_width = self.video_size.width() * self.zoom_factor
+        scaled_height = self.video_size.height() * self.zoom_factor
+        
+        x_offset = (self.width() - scaled_width) / 2 + self.pan_offset.x()
+        y_offset = (self.height() - scaled_height) / 2 + self.pan_offset.y()
+        
+        return QRectF(x * self.zoom_factor + x_offset, y * self.zoom_factor + y_offset,
+                      w * self.zoom_factor, h * self.zoom_factor)
 
 
 class OBSCompleteAssistantOptimized(QMainWindow):
@@ -1329,13 +3687,17 @@ class OBSCompleteAssistantOptimized(QMainWindow):
         self.setup_logging()
         
         # Видео переменные
-        self.cap = None
+        self.capture_worker = None
+        self.stopping_capture_workers = []  # Остановленные, но еще не вышедшие из read() потоки захвата
+        self.frame_buffer = FrameRingBuffer()
+        self.last_frame_id = 0
+        self.last_changed_id = 0
+        self.file_source = None
         self.current_frame = None
         self.ocr_worker = None
         self.history = []
         self.audio_history = []
         self.screen_capture_mode = False
-        self.mss = None
         
         # Аудио переменные
         self.audio_worker = None
@@ -1349,8 +3711,22 @@ class OBSCompleteAssistantOptimized(QMainWindow):
         self.last_autosave = datetime.now()
         
         # Переменные для оптимизации производительности
-        self.last_ocr_hash = None
-        self.performance_mode = False
+        self.frame_scheduler = self.create_frame_scheduler()
+        self.ocr_engine_pool = OCREnginePool()
+        self.ocr_process_pool = None
+        self.psm_stats = PSMStats()
+        self.last_content_types = {}  # Форма области -> тип контента последнего результата (подсказка PSMStats)
+        self.ocr_cache = self.create_ocr_cache()
+        self.buffer_pool = BufferPool()
+        self.debug_writer = DebugImageWriter(
+            image_format=self.settings.get('debug_image_format', 'png'),
+            compression=self.settings.get('debug_image_compression', 1)
+        )
+        self.debug_request_id = None
+        self.preprocessing_pipeline = self.create_preprocessing_pipeline()
+        self.phash_index = PerceptualHashIndex(self.settings.get('phash_max_distance', 10))
+        self.text_detector = TextRegionDetector()
+        self.region_watchers = []
         
         # Плавающие окна
         self.response_window = None
@@ -1368,6 +3744,9 @@ class OBSCompleteAssistantOptimized(QMainWindow):
         # Загружаем сохраненную историю
         self.load_history_from_file()
         
+        # Прогреваем OCR движки в фоне
+        self.warm_up_ocr_engines()
+        
         self.logger.info("Application started successfully")
         
     def setup_logging(self):
@@ -1399,6 +3778,44 @@ class OBSCompleteAssistantOptimized(QMainWindow):
             self.audio_window.toggle_recording_requested.connect(self.toggle_recording)
             self.audio_window.save_audio_text_requested.connect(self.save_audio_text)
             
+    def warm_up_ocr_engines(self):
+        """Фоновая загрузка языковых моделей Tesseract для текущего языка OCR"""
+        if not self.ocr_engine_pool.in_process:
+            self.logger.info("tesserocr not installed - OCR uses pytesseract subprocesses")
+            return
+        language = self.settings.get('ocr_language', 'eng')
+        threading.Thread(
+            target=self.ocr_engine_pool.warm_up,
+            args=(language, OCRWorker.psm_modes),
+            daemon=True
+        ).start()
+        
+    def create_ocr_cache(self):
+        """Кеш результатов OCR; дисковый уровень включается в настройках"""
+        cache_dir = "ocr_cache" if self.settings.get('ocr_disk_cache', False) else None
+        return OCRResultCache(capacity=self.settings.get('ocr_cache_size', 128), cache_dir=cache_dir)
+        
+    def ocr_cache_settings(self):
+        """Настройки, от которых зависит результат OCR (входят в ключ кеша)"""
+        keys = ['preprocessing', 'ocr_ensemble', 'scale_factor', 'auto_scale', 'high_quality_mode', 'adaptive_preprocessing',
+                'preprocessing_stages', 'denoise_before_upscale', 'denoise_method', 'binarization_method',
+                'ocr_language', 'use_openai', 'model', 'interview_mode', 'text_region_detection']
+        return {key: self.settings.get(key) for key in keys}
+        
+    def get_ocr_process_pool(self):
+        """Пул процессов для параллельных PSM проходов (создается при первом использовании)"""
+        if not self.settings.get('parallel_psm', False):
+            return None
+        if self.ocr_process_pool is None:
+            self.ocr_process_pool = create_ocr_process_pool(ocr_parallel_passes())
+            self.logger.info("OCR process pool started")
+        return self.ocr_process_pool
+        
+    def shutdown_ocr_process_pool(self):
+        if self.ocr_process_pool is not None:
+            self.ocr_process_pool.shutdown(wait=False)
+            self.ocr_process_pool = None
+            
     def setup_shortcuts(self):
         """Настройка горячих клавиш"""
         # Ctrl+R - переключить запись
@@ -1430,20 +3847,16 @@ class OBSCompleteAssistantOptimized(QMainWindow):
         
     def setup_timers(self):
         """Настройка таймеров"""
-        # Таймер обновления видео с адаптивной частотой
+        # Таймер обновления видео; частоту подстраивает FrameScheduler
         self.video_timer = QTimer()
         self.video_timer.timeout.connect(self.update_frame)
-        self.video_timer.start(33)  # 30 FPS по умолчанию
+        self.video_timer.start(int(self.frame_scheduler.interval() * 1000))
         
         # Таймер автосохранения
         self.autosave_timer = QTimer()
         self.autosave_timer.timeout.connect(self.autosave_data)
         self.autosave_timer.start(30000)  # 30 секунд
-        
-        # Таймер оптимизации производительности
-        self.perf_timer = QTimer()
-        self.perf_timer.timeout.connect(self.optimize_performance)
-        self.perf_timer.start(5000)  # 5 секунд
+
         
     def load_settings(self):
         load_dotenv()
@@ -1453,12 +3866,39 @@ class OBSCompleteAssistantOptimized(QMainWindow):
             'model': 'gpt-4o',
             'video_source': 0,
             'video_file_path': '',
+            'screen_monitor': 1,
+            'screen_region': [],
             'ocr_language': 'eng',
             'preprocessing': True,
             'scale_factor': 3,
+            'auto_scale': True,
+            'preprocessing_threads': 0,
+            'ocr_ensemble': False,
             'debug_images': False,
+            'debug_image_format': 'png',
+            'debug_image_compression': 1,
             'debug_console': False,
             'high_quality_mode': False,
+            'parallel_psm': False,
+            'psm_confidence_threshold': 100,
+            'ocr_cache_size': 128,
+            'ocr_disk_cache': False,
+            'near_duplicate_detection': False,
+            'phash_max_distance': 10,
+            'text_region_detection': True,
+            'watch_settle_frames': 5,
+            'watch_change_threshold': 24,
+            'skip_static_frames': True,
+            'preview_downscale': True,
+            'frame_cpu_budget': 25,
+            'max_fps': 30,
+            'incremental_line_ocr': True,
+            'stream_results': True,
+            'adaptive_preprocessing': True,
+            'preprocessing_stages': list(PreprocessingPipeline.stage_names),
+            'denoise_before_upscale': False,
+            'denoise_method': 'nlmeans',
+            'binarization_method': 'auto',
             'interview_mode': False,
             'user_name': '',
             'whisper_language': 'auto',
@@ -1530,6 +3970,17 @@ class OBSCompleteAssistantOptimized(QMainWindow):
         self.reset_view_button.setToolTip("Сбросить зум и панорамирование видео")
         controls_layout.addWidget(self.reset_view_button)
         
+        self.watch_button = QPushButton("📌 Watch Region")
+        self.watch_button.clicked.connect(self.watch_selection)
+        self.watch_button.setToolTip("Закрепить выделение: OCR запускается автоматически при изменении области")
+        controls_layout.addWidget(self.watch_button)
+        
+        self.clear_watches_button = QPushButton("🧹 Clear Watches")
+        self.clear_watches_button.clicked.connect(self.clear_watched_regions)
+        self.clear_watches_button.setEnabled(False)
+        self.clear_watches_button.setToolTip("Убрать все закрепленные области")
+        controls_layout.addWidget(self.clear_watches_button)
+        
         # Аудио кнопки
         self.record_button = QPushButton("🎤 Start Recording (Ctrl+R)")
         self.record_button.clicked.connect(self.toggle_recording)
@@ -1591,9 +4042,34 @@ class OBSCompleteAssistantOptimized(QMainWindow):
         
         self.video_widget = VideoWidget()
         self.video_widget.selectionMade.connect(self.handle_selection)
+        self.video_widget.interactionStarted.connect(self.boost_frame_rate)
         self.video_widget.setMinimumSize(640, 480)
         left_layout.addWidget(self.video_widget)
         
+        # Воспроизведение файла: пауза и перемотка
+        self.playback_bar = QWidget()
+        playback_layout = QHBoxLayout()
+        playback_layout.setContentsMargins(0, 0, 0, 0)
+        self.playback_bar.setLayout(playback_layout)
+        
+        self.play_button = QPushButton("⏸")
+        self.play_button.setFixedWidth(40)
+        self.play_button.clicked.connect(self.toggle_playback)
+        self.play_button.setToolTip("Пауза/воспроизведение видеофайла")
+        playback_layout.addWidget(self.play_button)
+        
+        self.seek_slider = QSlider(Qt.Horizontal)
+        self.seek_slider.sliderReleased.connect(self.seek_to_slider)
+        self.seek_slider.sliderMoved.connect(self.update_playback_time)
+        self.seek_slider.setToolTip("Перемотка: кадр показывается сразу, его можно выделить для OCR")
+        playback_layout.addWidget(self.seek_slider)
+        
+        self.playback_time_label = QLabel("00:00 / 00:00")
+        playback_layout.addWidget(self.playback_time_label)
+        
+        self.playback_bar.setVisible(False)
+        left_layout.addWidget(self.playback_bar)
+        
         main_splitter.addWidget(left_panel)
         
         # Правая часть - OCR редактор
@@ -1837,18 +4313,11 @@ class OBSCompleteAssistantOptimized(QMainWindow):
         if source_id is None:
             source_id = self.settings.get('video_source', 0)
         
-        if self.cap:
-            self.cap.release()
-            self.cap = None
-        
-        # Отключаем предыдущий режим захвата экрана
+        # Останавливаем предыдущий источник (камеру, файл или захват экрана)
+        self.stop_capture()
         self.screen_capture_mode = False
-        if hasattr(self, 'mss') and self.mss:
-            try:
-                self.mss.close()
-            except:
-                pass
-            self.mss = None
+        self.file_source = None
+        self.playback_bar.setVisible(False)
         
         try:
             if source_id == -1:  # Desktop capture
@@ -1868,7 +4337,7 @@ class OBSCompleteAssistantOptimized(QMainWindow):
                         cap.set(cv2.CAP_PROP_FRAME_HEIGHT, 1080)
                         cap.set(cv2.CAP_PROP_FPS, 30)
                         
-                        self.cap = cap
+                        self.start_capture(VideoCaptureSource(cap, paced=False))
                         self.settings['video_source'] = source_id
                         self.status_widget.show_message(f"Connected to camera {source_id}", 3)
                         self.logger.info(f"Connected to camera {source_id}")
@@ -1883,22 +4352,28 @@ class OBSCompleteAssistantOptimized(QMainWindow):
     
     def setup_screen_capture(self):
         """Настройка захвата экрана"""
-        try:
-            import mss
-            self.mss = mss.mss()
-            self.screen_capture_mode = True
-            self.settings['video_source'] = -1
-            self.status_widget.show_message("Screen capture enabled", 3)
-            self.logger.info("Screen capture enabled")
-        except ImportError:
+        # Сам mss импортирует поток захвата - здесь только проверяем, что он установлен
+        if importlib.util.find_spec('mss') is None:
             self.status_widget.show_message("mss library not installed for screen capture", 5)
             self.logger.error("mss library not available")
+            return
+        monitor = self.settings.get('screen_monitor', 1)
+        region = self.settings.get('screen_region', [])
+        self.start_capture(ScreenCaptureSource(monitor, region))
+        self.screen_capture_mode = True
+        self.settings['video_source'] = -1
+        area = f"monitor {monitor}" + (f", region {region}" if region else "")
+        self.status_widget.show_message(f"Screen capture enabled ({area})", 3)
+        self.logger.info(f"Screen capture enabled ({area})")
     
     def setup_file_capture(self, file_path):
         """Настройка захвата из файла"""
         cap = cv2.VideoCapture(file_path)
         if cap.isOpened():
-            self.cap = cap
+            self.file_source = VideoFileSource(cap, file_path)
+            self.start_capture(self.file_source)
+            self.playback_bar.setVisible(True)
+            self.update_playback_bar()
             self.settings['video_source'] = -2
             self.settings['video_file_path'] = file_path
             self.status_widget.show_message(f"Opened file: {file_path}", 3)
@@ -1906,46 +4381,171 @@ class OBSCompleteAssistantOptimized(QMainWindow):
         else:
             self.status_widget.show_message(f"Failed to open file: {file_path}", 5)
                 
-        if not self.cap:
+        if self.capture_worker is None:
             self.status_widget.show_message("No DirectShow camera found - Audio recording available", 5)
             self.logger.warning("No DirectShow camera found")
             
-    def optimize_performance(self):
-        """Динамическая оптимизация производительности"""
-        # Если нет активных операций, снижаем частоту обновления видео
-        active_operations = any([
-            self.ocr_worker and self.ocr_worker.isRunning(),
-            self.transcription_worker and self.transcription_worker.isRunning(),
-            self.response_worker and self.response_worker.isRunning(),
-            self.video_widget.is_selecting,
-            self.video_widget.is_panning
-        ])
-        
-        if not active_operations and not self.performance_mode:
-            self.video_timer.setInterval(100)  # 10 FPS
-            self.performance_mode = True
-            self.logger.debug("Switched to performance mode (10 FPS)")
-        elif active_operations and self.performance_mode:
-            self.video_timer.setInterval(33)   # 30 FPS
-            self.performance_mode = False
-            self.logger.debug("Switched to normal mode (30 FPS)")
+    def create_frame_scheduler(self):
+        return FrameScheduler(
+            cpu_budget=self.settings.get('frame_cpu_budget', 25) / 100,
+            max_fps=self.settings.get('max_fps', 30)
+        )
+        
+    def boost_frame_rate(self):
+        """Пользователь начал выделение - полная частота сразу, не дожидаясь статистики"""
+        self.frame_scheduler.boost()
+        self.schedule_frames()
+        
+    def schedule_frames(self):
+        """Интервал таймера показа и потока захвата по оценке FrameScheduler"""
+        interval = self.frame_scheduler.interval()
+        milliseconds = max(1, int(interval * 1000))
+        current = self.video_timer.interval()
+        # Мелкие колебания оценки не перезапускают таймер
+        if abs(milliseconds - current) <= max(2, current // 10):
+            return
+        self.video_timer.setInterval(milliseconds)
+        if self.capture_worker is not None:
+            self.capture_worker.set_interval(interval)
+        self.logger.debug(f"Frame interval {milliseconds} ms (motion {self.frame_scheduler.motion:.2f}, "
+                          f"capture {self.frame_scheduler.capture_cost * 1000:.1f} ms, "
+                          f"render {self.frame_scheduler.render_cost * 1000:.1f} ms)")
+            
+    def start_capture(self, source):
+        """Запустить поток захвата для источника кадров"""
+        self.stop_capture()
+        self.frame_buffer.clear()
+        interval = self.video_timer.interval() / 1000 if hasattr(self, 'video_timer') else 0.033
+        self.capture_worker = CaptureWorker(source, self.frame_buffer, interval, self.create_change_detector())
+        self.capture_worker.error_occurred.connect(self.handle_capture_error)
+        self.capture_worker.start()
+        
+    def create_change_detector(self):
+        if self.settings.get('skip_static_frames', True):
+            return FrameChangeDetector()
+        return None
+        
+    def get_preview_view(self, current=None):
+        """Превью: видимая часть кадра с запасом для панорамирования, в масштабе зума с учетом
+        плотности пикселей экрана (не больше 1). Пока текущая часть покрывает вид, она не меняется"""
+        if not self.settings.get('preview_downscale', True):
+            return (1.0, None)
+        widget = self.video_widget
+        scale = min(1.0, widget.zoom_factor * widget.devicePixelRatioF())
+        visible = widget.visible_video_rect()
+        if visible is None:
+            return (scale, None)
+        if current is not None and current[0] == scale and current[1] is not None:
+            x, y, w, h = current[1]
+            vx, vy, vw, vh = visible
+            if x <= vx and y <= vy and vx + vw <= x + w and vy + vh <= y + h:
+                return current
+        # Запас в четверть видимой части с каждой стороны: панорамирование не пересобирает превью на каждом кадре
+        vx, vy, vw, vh = visible
+        video_width, video_height = widget.video_size.width(), widget.video_size.height()
+        x1, y1 = max(0, vx - vw // 4), max(0, vy - vh // 4)
+        x2, y2 = min(video_width, vx + vw + vw // 4), min(video_height, vy + vh + vh // 4)
+        if (x1, y1, x2, y2) == (0, 0, video_width, video_height):
+            return (scale, None)
+        return (scale, (x1, y1, x2 - x1, y2 - y1))
+        
+    def stop_capture(self):
+        worker = self.capture_worker
+        if worker is None:
+            return
+        self.capture_worker = None
+        worker.stop()
+        worker.error_occurred.disconnect(self.handle_capture_error)
+        if not worker.wait(3000):
+            # Чтение зависло (камера, сетевой поток): поток удаляем только после его завершения
+            self.logger.warning("Capture thread is still blocked in read, releasing it when it finishes")
+            self.stopping_capture_workers.append(worker)
+            worker.finished.connect(lambda: self.release_capture_worker(worker))
+            
+    def release_capture_worker(self, worker):
+        if worker in self.stopping_capture_workers:
+            self.stopping_capture_workers.remove(worker)
+        worker.deleteLater()
             
+    @pyqtSlot(str)
+    def handle_capture_error(self, error_msg):
+        self.status_widget.show_message(error_msg, 3)
+        self.logger.error(error_msg)
+        
+    def format_playback_time(self, msec):
+        seconds = int(msec // 1000)
+        hours, seconds = divmod(seconds, 3600)
+        minutes, seconds = divmod(seconds, 60)
+        return f"{hours}:{minutes:02d}:{seconds:02d}" if hours else f"{minutes:02d}:{seconds:02d}"
+        
+    def update_playback_time(self, frame_index=None):
+        source = self.file_source
+        if frame_index is None:
+            frame_index = source.position
+        total = self.format_playback_time(source.time_of(max(0, source.frame_count - 1)))
+        self.playback_time_label.setText(f"{self.format_playback_time(source.time_of(frame_index))} / {total}")
+        
+    def update_playback_bar(self):
+        """Положение ползунка и кнопка паузы по состоянию файла"""
+        source = self.file_source
+        if source is None:
+            return
+        # До конца индексации число кадров уточняется
+        maximum = max(0, source.frame_count - 1)
+        if self.seek_slider.maximum() != maximum:
+            self.seek_slider.setMaximum(maximum)
+        if not self.seek_slider.isSliderDown():
+            self.seek_slider.setValue(source.position)
+            self.update_playback_time()
+        self.play_button.setText("▶" if source.paused else "⏸")
+        
+    def toggle_playback(self):
+        source = self.file_source
+        if source is None:
+            return
+        if source.ended:
+            source.seek(0)
+        source.set_paused(not source.paused)
+        self.update_playback_bar()
+        
+    def seek_to_slider(self):
+        if self.file_source is None:
+            return
+        self.file_source.seek(self.seek_slider.value())
+        # Кадр после перемотки показываем сразу, даже если сцена была статичной
+        self.boost_frame_rate()
+        
     def update_frame(self):
-        if hasattr(self, 'screen_capture_mode') and self.screen_capture_mode:
-            # Захват экрана
-            try:
-                screenshot = self.mss.grab(self.mss.monitors[0])  # Главный монитор
-                frame = np.array(screenshot)
-                frame = cv2.cvtColor(frame, cv2.COLOR_BGRA2BGR)
-                self.current_frame = frame
-                self.video_widget.set_frame(frame)
-            except Exception as e:
-                self.status_widget.show_message(f"Screen capture error: {str(e)}", 3)
-        elif self.cap and self.cap.isOpened():
-            ret, frame = self.cap.read()
-            if ret:
-                self.current_frame = frame
-                self.video_widget.set_frame(frame)
+        """Показать самый свежий кадр из буфера потока захвата"""
+        if self.video_widget.is_selecting or self.video_widget.is_panning:
+            self.frame_scheduler.boost()
+        self.schedule_frames()
+        self.update_playback_bar()
+        if self.capture_worker is not None:
+            self.capture_worker.preview_view = self.get_preview_view(self.capture_worker.preview_view)
+        frame_id, changed_id, frame, preview = self.frame_buffer.latest()
+        if frame is None or frame_id == self.last_frame_id:
+            return
+        started = time.perf_counter()
+        self.last_frame_id = frame_id
+        changed = changed_id != self.last_changed_id
+        # Кадры в буфере не изменяются - OCR может держать ссылку без копирования.
+        # Выделение всегда берет самый новый кадр, даже если детектор не заметил разницы
+        self.current_frame = frame
+        if changed:
+            self.last_changed_id = changed_id
+            self.video_widget.set_frame(frame, preview)
+            
+        # Закрепленные области сравнивают свое содержимое сами, не полагаясь на оценку всего кадра
+        if self.region_watchers:
+            self.check_watched_regions(frame)
+            
+        self.frame_scheduler.record_motion(changed)
+        if self.capture_worker is not None:
+            self.frame_scheduler.record_capture(self.capture_worker.frame_cost)
+        if changed:
+            # Отрисовка прошлого кадра идет после update_frame - берем ее время из виджета
+            self.frame_scheduler.record_render(time.perf_counter() - started + self.video_widget.paint_cost)
                 
     def handle_selection(self, rect):
         self.selected_rect = rect
@@ -1954,102 +4554,45 @@ class OBSCompleteAssistantOptimized(QMainWindow):
         self.status_widget.show_progress("Processing OCR with GPT-4o...", 0)
         self.process_ocr()
         
-    def preprocess_image(self, image):
-        """Улучшенная предобработка изображения для лучшего OCR"""
-        # Увеличиваем изображение в соответствии с настройками
-        scale_factor = self.settings.get('scale_factor', 3)
-        high_quality = self.settings.get('high_quality_mode', False)
-        height, width = image.shape[:2] if len(image.shape) == 3 else image.shape
-        new_width = int(width * scale_factor)
-        new_height = int(height * scale_factor)
-        
-        # Используем INTER_CUBIC для лучшего качества при увеличении
-        upscaled = cv2.resize(image, (new_width, new_height), interpolation=cv2.INTER_CUBIC)
-        
-        # Конвертируем в оттенки серого
-        if len(upscaled.shape) == 3:
-            gray = cv2.cvtColor(upscaled, cv2.COLOR_BGR2GRAY)
-        else:
-            gray = upscaled
-        
-        # Применяем Gaussian blur для сглаживания шума
-        if high_quality:
-            blurred = cv2.GaussianBlur(gray, (3, 3), 0)
-        else:
-            blurred = cv2.GaussianBlur(gray, (1, 1), 0)
-        
-        # Улучшенная денойзинг обработка
-        if high_quality:
-            # Более сильная денойзинг обработка для высокого качества
-            denoised = cv2.fastNlMeansDenoising(blurred, h=8, templateWindowSize=9, searchWindowSize=23)
-        else:
-            denoised = cv2.fastNlMeansDenoising(blurred, h=10, templateWindowSize=7, searchWindowSize=21)
-        
-        # Улучшение контраста с помощью CLAHE
-        clahe = cv2.createCLAHE(clipLimit=2.0, tileGridSize=(8,8))
-        enhanced = clahe.apply(denoised)
-        
-        # Адаптивная бинаризация для лучшего результата на разных типах текста
-        adaptive_thresh = cv2.adaptiveThreshold(
-            enhanced, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C, cv2.THRESH_BINARY, 11, 2
+    def create_preprocessing_pipeline(self):
+        return PreprocessingPipeline(
+            scale_factor=self.settings.get('scale_factor', 3),
+            high_quality=self.settings.get('high_quality_mode', False),
+            adaptive=self.settings.get('adaptive_preprocessing', True),
+            enabled_stages=self.settings.get('preprocessing_stages'),
+            timing_hook=self.log_preprocessing_stage,
+            denoise_first=self.settings.get('denoise_before_upscale', False),
+            denoise_method=self.settings.get('denoise_method', 'nlmeans'),
+            binarization_method=self.settings.get('binarization_method', 'auto'),
+            auto_scale=self.settings.get('auto_scale', True),
+            buffer_pool=self.buffer_pool,
+            tile_workers=self.settings.get('preprocessing_threads', 0)
         )
         
-        # Также пробуем OTSU метод
-        _, otsu_thresh = cv2.threshold(enhanced, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
-        
-        # Выбираем лучший результат на основе количества белых пикселей
-        adaptive_white = np.sum(adaptive_thresh == 255)
-        otsu_white = np.sum(otsu_thresh == 255)
-        
-        # Используем тот метод, который дает больше белых пикселей (обычно лучше для текста)
-        if adaptive_white > otsu_white:
-            binary = adaptive_thresh
-        else:
-            binary = otsu_thresh
-        
-        # Морфологические операции для очистки
-        if high_quality:
-            # Более тщательная обработка для высокого качества
-            kernel_small = np.ones((1, 1), np.uint8)
-            kernel_medium = np.ones((2, 2), np.uint8)
-            kernel_large = np.ones((3, 3), np.uint8)
-            
-            # Удаляем очень мелкий шум
-            opening = cv2.morphologyEx(binary, cv2.MORPH_OPEN, kernel_small, iterations=1)
-            
-            # Заполняем пробелы в буквах
-            closing = cv2.morphologyEx(opening, cv2.MORPH_CLOSE, kernel_medium, iterations=2)
-            
-            # Дополнительная очистка
-            processed = cv2.morphologyEx(closing, cv2.MORPH_GRADIENT, kernel_large, iterations=1)
-            processed = cv2.bitwise_or(closing, processed)
-            
-            # Финальная очистка
-            processed = cv2.medianBlur(processed, 5)
-        else:
-            # Стандартная обработка
-            kernel = np.ones((2, 2), np.uint8)
-            
-            # Удаляем мелкий шум
-            opening = cv2.morphologyEx(binary, cv2.MORPH_OPEN, kernel, iterations=1)
-            
-            # Заполняем пробелы в буквах
-            closing = cv2.morphologyEx(opening, cv2.MORPH_CLOSE, kernel, iterations=1)
-            
-            # Дополнительная очистка от мелких артефактов
-            processed = cv2.medianBlur(closing, 3)
+    def log_preprocessing_stage(self, name, seconds):
+        self.logger.debug(f"Preprocessing stage {name}: {seconds * 1000:.1f} ms")
         
+    def preprocess_image(self, image):
+        """Улучшенная предобработка изображения для лучшего OCR"""
+        processed = self.preprocessing_pipeline.run(image)
+        if self.settings.get('debug_console', False):
+            pipeline = self.preprocessing_pipeline
+            stages = ', '.join(f"{name} {seconds * 1000:.1f}ms" for name, seconds in pipeline.last_timings)
+            quality = f" ({pipeline.last_quality})" if pipeline.last_quality else ""
+            binarization = f", binarization: {pipeline.last_binarization}" if pipeline.last_binarization else ""
+            print(f"⏱ Preprocessing{quality}: {stages}{binarization}, scale {pipeline.last_scale:.2f}x")
         return processed
         
-    def process_ocr(self):
+    def get_selection_frame_rect(self):
+        """Выделение в координатах кадра (x, y, w, h) или None"""
         if self.current_frame is None or not hasattr(self, 'selected_rect'):
-            return
+            return None
             
         top_left = self.video_widget.get_video_coords_from_widget(self.selected_rect.topLeft())
         bottom_right = self.video_widget.get_video_coords_from_widget(self.selected_rect.bottomRight())
         
         if not top_left or not bottom_right:
-            return
+            return None
             
         x1 = max(0, int(top_left.x()))
         y1 = max(0, int(top_left.y()))
@@ -2058,50 +4601,109 @@ class OBSCompleteAssistantOptimized(QMainWindow):
         
         if x2 <= x1 or y2 <= y1:
             self.status_widget.show_message("Invalid selection", 3)
+            return None
+        return (x1, y1, x2 - x1, y2 - y1)
+        
+    def process_ocr(self):
+        frame_rect = self.get_selection_frame_rect()
+        if frame_rect is None:
             return
             
-        roi = self.current_frame[y1:y2, x1:x2]
+        x, y, w, h = frame_rect
+        roi = self.current_frame[y:y + h, x:x + w]
         
         # Проверяем минимальный размер выделенной области
         if roi.shape[0] < 20 or roi.shape[1] < 20:
             self.status_widget.show_message("Selection too small for OCR", 3)
             return
         
-        # Проверка кеша для избежания повторной обработки
-        roi_hash = hash(roi.tobytes())
-        if roi_hash == self.last_ocr_hash:
-            self.status_widget.show_message("Using cached OCR result", 2)
+        self.start_ocr(roi)
+        
+    def watch_selection(self):
+        """Закрепить текущее выделение как область наблюдения"""
+        frame_rect = self.get_selection_frame_rect()
+        if frame_rect is None:
+            self.status_widget.show_message("Select an area to watch first", 3)
+            return
+        if frame_rect[2] < 20 or frame_rect[3] < 20:
+            self.status_widget.show_message("Selection too small for OCR", 3)
             return
-        self.last_ocr_hash = roi_hash
+            
+        watcher = RegionWatcher(
+            frame_rect,
+            change_threshold=self.settings.get('watch_change_threshold', 24),
+            settle_frames=self.settings.get('watch_settle_frames', 5)
+        )
+        self.region_watchers.append(watcher)
+        self.video_widget.set_watched_rects([w.rect for w in self.region_watchers])
+        self.clear_watches_button.setEnabled(True)
+        self.status_widget.show_message(f"📌 Watching region {len(self.region_watchers)} - OCR runs when it changes", 3)
+        self.logger.info(f"Watching region {frame_rect}")
+        
+    def clear_watched_regions(self):
+        self.region_watchers = []
+        self.video_widget.set_watched_rects([])
+        self.clear_watches_button.setEnabled(False)
+        self.status_widget.show_message("Watched regions cleared", 2)
+        
+    def check_watched_regions(self, frame):
+        """Дешевая проверка закрепленных областей; OCR только после изменения и стабилизации"""
+        ocr_busy = self.ocr_worker is not None and self.ocr_worker.isRunning()
+        for index, watcher in enumerate(self.region_watchers, 1):
+            x, y, w, h = watcher.rect
+            if y + h > frame.shape[0] or x + w > frame.shape[1]:
+                continue  # Источник сменился на кадр меньшего размера
+            watcher.update(frame)
+            if ocr_busy or not watcher.ready():
+                continue
+            watcher.mark_processed()
+            ocr_busy = True
+            self.cancel_button.setEnabled(True)
+            self.status_widget.show_progress(f"📌 Region {index} changed - processing OCR...", 0)
+            self.start_ocr(watcher.crop(frame), region_watcher=watcher)
+            
+    def start_ocr(self, roi, region_watcher=None):
+        """Запуск OCR для области кадра: кеш, предобработка и воркер"""
+        # Общий ID для всех отладочных изображений этого запроса
+        self.debug_request_id = self.debug_writer.new_request_id()
         
-        if self.settings.get('preprocessing', True):
-            processed_roi = self.preprocess_image(roi)
-            pil_image = Image.fromarray(processed_roi)
+        # Проверка кеша для избежания повторной обработки
+        cache_settings = self.ocr_cache_settings()
+        cache_key = OCRResultCache.make_key(roi, cache_settings)
+        cached = self.ocr_cache.get(cache_key)
+        if cached is not None:
+            self.show_cached_ocr_result(cached, "Using cached OCR result")
+            return
             
-            # Опционально сохраняем отладочные изображения
-            if self.settings.get('debug_images', False):
-                try:
-                    debug_dir = "debug_images"
-                    os.makedirs(debug_dir, exist_ok=True)
-                    
-                    # Сохраняем оригинал и обработанное изображение
-                    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-                    cv2.imwrite(f"{debug_dir}/original_{timestamp}.png", roi)
-                    cv2.imwrite(f"{debug_dir}/processed_{timestamp}.png", processed_roi)
-                    print(f"Debug images saved to {debug_dir}/")
-                except Exception as e:
-                    print(f"Failed to save debug images: {e}")
+        # Почти одинаковое выделение (шум видео) - переиспользуем OCR и ответ GPT
+        near_duplicate = None
+        if self.settings.get('near_duplicate_detection', False):
+            settings_key = json.dumps(cache_settings, sort_keys=True)
+            fingerprint = PerceptualHashIndex.fingerprint(roi)
+            similar_key = self.phash_index.find(fingerprint, settings_key)
+            cached = self.ocr_cache.get(similar_key) if similar_key else None
+            if cached is not None:
+                self.show_cached_ocr_result(cached, "Using OCR result of a near-identical selection")
+                return
+            near_duplicate = (fingerprint, settings_key)
+        
+        # Закрепленная область: заново распознаем только изменившиеся строки
+        blocks = None
+        reused_lines = 0
+        if region_watcher is not None and self.settings.get('incremental_line_ocr', True):
+            blocks, reused_lines = self.build_incremental_blocks(roi, region_watcher)
+            
+        # Большие области: распознаем только найденные текстовые блоки
+        if not blocks:
+            blocks = self.detect_text_blocks(roi)
+        variants = None
+        if blocks:
+            pil_image = None
+        elif self.settings.get('preprocessing', True) and self.settings.get('ocr_ensemble', False):
+            pil_image = None
+            variants = self.prepare_ensemble_images(roi)
         else:
-            # Даже без preprocessing применяем минимальные улучшения
-            if len(roi.shape) == 3:
-                rgb_roi = cv2.cvtColor(roi, cv2.COLOR_BGR2RGB)
-            else:
-                rgb_roi = roi
-                
-            # Увеличиваем изображение хотя бы в 2 раза
-            height, width = rgb_roi.shape[:2]
-            upscaled = cv2.resize(rgb_roi, (width*2, height*2), interpolation=cv2.INTER_CUBIC)
-            pil_image = Image.fromarray(upscaled)
+            pil_image = self.prepare_ocr_image(roi)
             
         if self.settings.get('ocr_language', 'eng') != 'eng':
             pytesseract.pytesseract.tesseract_cmd = pytesseract.pytesseract.tesseract_cmd
@@ -2111,48 +4713,214 @@ class OBSCompleteAssistantOptimized(QMainWindow):
         quality_info = []
         if self.settings.get('preprocessing', True):
             scale = self.settings.get('scale_factor', 3)
-            quality_info.append(f"Scale: {scale}x")
+            if self.settings.get('auto_scale', True):
+                quality_info.append(f"Scale: auto ≤{scale}x")
+            else:
+                quality_info.append(f"Scale: {scale}x")
             if self.settings.get('high_quality_mode', False):
                 quality_info.append("HQ mode")
+        if variants:
+            quality_info.append(f"ensemble of {len(variants)}")
+        if reused_lines:
+            quality_info.append(f"{len(blocks) - reused_lines}/{len(blocks)} lines changed")
+        elif blocks:
+            quality_info.append(f"{len(blocks)} text blocks")
         
         status_msg = f"Processing OCR ({', '.join(quality_info) if quality_info else 'Standard'})..."
         self.status_widget.show_message(status_msg, 2)
         
+        shape_class = PSMStats.shape_class(roi.shape[1], roi.shape[0])
+        if region_watcher is not None:
+            content_type_hint = region_watcher.last_content_type
+        else:
+            content_type_hint = self.last_content_types.get(shape_class)
+        
         self.ocr_worker = OCRWorker(
             pil_image, 
             self.settings.get('use_openai', False),
             self.settings.get('api_key', ''),
             self.settings.get('model', 'gpt-4o'),
             self.settings.get('interview_mode', False),
-            self.settings.get('debug_console', False)
+            self.settings.get('debug_console', False),
+            language=self.settings.get('ocr_language', 'eng'),
+            engine_pool=self.ocr_engine_pool,
+            process_pool=self.get_ocr_process_pool(),
+            confidence_threshold=self.settings.get('psm_confidence_threshold', 100),
+            psm_stats=self.psm_stats,
+            shape_class=shape_class,
+            content_type_hint=content_type_hint,
+            blocks=blocks,
+            stream_results=self.settings.get('stream_results', True),
+            variants=variants
         )
+        self.ocr_worker.region_watcher = region_watcher
+        self.ocr_worker.cache_key = cache_key
+        self.ocr_worker.near_duplicate = near_duplicate
         self.ocr_worker.result_ready.connect(self.handle_ocr_result)
+        self.ocr_worker.partial_result.connect(self.handle_ocr_partial)
         self.ocr_worker.error_occurred.connect(self.handle_ocr_error)
         self.ocr_worker.progress_updated.connect(self.handle_ocr_progress)
         self.ocr_worker.start()
         
         self.logger.info("Started OCR processing with GPT-4o")
         
+    def prepare_ocr_image(self, roi, debug_name=""):
+        """Изображение для Tesseract: полная предобработка или минимальное увеличение"""
+        if self.settings.get('preprocessing', True):
+            processed_roi = self.preprocess_image(roi)
+            pil_image = Image.fromarray(processed_roi)
+            
+            # Опционально сохраняем отладочные изображения
+            if self.settings.get('debug_images', False):
+                self.save_debug_images(roi, processed_roi, debug_name)
+        else:
+            # Даже без preprocessing применяем минимальные улучшения
+            if len(roi.shape) == 3:
+                code = cv2.COLOR_BGRA2RGB if roi.shape[2] == 4 else cv2.COLOR_BGR2RGB
+                rgb_roi = cv2.cvtColor(roi, code)
+            else:
+                rgb_roi = roi
+                
+            # Увеличиваем изображение хотя бы в 2 раза
+            height, width = rgb_roi.shape[:2]
+            upscaled = cv2.resize(rgb_roi, (width*2, height*2), interpolation=cv2.INTER_CUBIC)
+            pil_image = Image.fromarray(upscaled)
+        return pil_image
+        
+    def prepare_ensemble_images(self, roi):
+        """Варианты предобработки для ансамбля OCR"""
+        variants = self.preprocessing_pipeline.variants(roi)
+        if self.settings.get('debug_images', False):
+            # Оригинал у всех вариантов один - пишем его один раз
+            self.save_debug_original(roi, "ensemble")
+            for name, image in variants.items():
+                self.save_debug_processed(image, f"ensemble_{name}")
+        return {name: Image.fromarray(image) for name, image in variants.items()}
+        
+    def save_debug_images(self, original, processed, debug_name=""):
+        """Поставить оригинал и обработанное изображение в очередь записи в debug_images/"""
+        self.save_debug_original(original, debug_name)
+        self.save_debug_processed(processed, debug_name)
+        
+    def debug_image_name(self, kind, debug_name):
+        if self.debug_request_id is None:
+            self.debug_request_id = self.debug_writer.new_request_id()
+        suffix = f"_{debug_name}" if debug_name else ""
+        return f"{kind}_{self.debug_request_id}{suffix}"
+        
+    def save_debug_original(self, original, debug_name=""):
+        # Область - срез кадра, который захват может перезаписать: в очередь идет копия
+        self.debug_writer.submit(self.debug_image_name("original", debug_name), original.copy())
+        
+    def save_debug_processed(self, processed, debug_name=""):
+        self.debug_writer.submit(self.debug_image_name("processed", debug_name), processed)
+            
+    def build_incremental_blocks(self, roi, region_watcher):
+        """Строки закрепленной области: неизменные берут текст с прошлого прохода"""
+        strips = LineStripCache.line_strips(roi, self.text_detector)
+        if len(strips) < 2:
+            return None, 0
+            
+        width = roi.shape[1]
+        blocks = []
+        reused = 0
+        for index, (y1, y2) in enumerate(strips):
+            strip = roi[y1:y2]
+            signature = LineStripCache.signature(strip)
+            cached = region_watcher.strip_cache.lookup(y1, signature)
+            if cached is not None:
+                block = OCRBlock(None, 7, (0, y1, width, y2 - y1))
+                block.result = cached
+                reused += 1
+            else:
+                block = OCRBlock(self.prepare_ocr_image(strip, f"line{index}"), 7, (0, y1, width, y2 - y1))
+            block.signature = signature
+            blocks.append(block)
+        self.logger.debug(f"Incremental OCR: {len(blocks) - reused} of {len(blocks)} lines changed")
+        return blocks, reused
+        
+    def detect_text_blocks(self, roi):
+        """Разбить большую область на текстовые блоки; None - распознавать область целиком"""
+        if not self.settings.get('text_region_detection', True):
+            return None
+        if roi.shape[0] * roi.shape[1] < self.text_detector.min_roi_area:
+            return None
+            
+        regions = self.text_detector.detect(roi)
+        if not regions:
+            return None
+            
+        blocks = []
+        for index, (x, y, w, h, line_count) in enumerate(regions):
+            crop = roi[y:y + h, x:x + w]
+            psm = 7 if line_count == 1 else 6  # Одна строка / однородный блок
+            blocks.append(OCRBlock(self.prepare_ocr_image(crop, f"block{index}"), psm, (x, y, w, h)))
+        self.logger.debug(f"Text region detection: {len(blocks)} blocks")
+        return blocks
+        
+    def show_cached_ocr_result(self, cached, message):
+        """Показать результат OCR из кеша без запуска Tesseract и GPT"""
+        self.handle_ocr_result(cached['raw_text'], cached['processed_text'], cached['content_type'])
+        self.status_widget.show_message(message, 2)
+        self.logger.info(message)
+        
     @pyqtSlot(int)
     def handle_ocr_progress(self, progress):
         self.status_widget.show_progress(f"Processing OCR with GPT-4o... {progress}%", progress)
         
+    def format_ocr_result(self, raw_text, processed_text, content_type):
+        """Текст результата для text_edit и истории"""
+        # Форматируем результат с указанием что это GPT-4o ответ
+        display_text = f"🤖 GPT-4o Response [{content_type.upper()}]\n"
+        display_text += "=" * 50 + "\n\n"
+        
+        if content_type != "text":
+            display_text += f"📝 Original OCR Text:\n{raw_text}\n\n"
+            display_text += "🔄 " + "=" * 45 + "\n\n"
+        
+        display_text += f"✨ GPT-4o Analysis:\n{processed_text}"
+        return display_text
+        
+    @pyqtSlot(str, str, str)
+    def handle_ocr_partial(self, raw_text, processed_text, content_type):
+        """Промежуточный результат: черновик OCR, затем ответ GPT по мере генерации"""
+        # Запоздавшие сигналы отмененного или предыдущего воркера не показываем
+        if self.sender() is not self.ocr_worker or self.ocr_worker.cancelled:
+            return
+        if processed_text:
+            self.text_edit.setText(self.format_ocr_result(raw_text, processed_text, content_type) + " ▌")
+        else:
+            self.text_edit.setText(f"📝 OCR (распознавание продолжается...):\n\n{raw_text}")
+            
     @pyqtSlot(str, str, str)
     def handle_ocr_result(self, raw_text, processed_text, content_type):
         self.cancel_button.setEnabled(False)
         self.status_widget.hide_progress()
         
-        if processed_text:
-            # Форматируем результат с указанием что это GPT-4o ответ
-            display_text = f"🤖 GPT-4o Response [{content_type.upper()}]\n"
-            display_text += "=" * 50 + "\n\n"
-            
-            if content_type != "text":
-                display_text += f"📝 Original OCR Text:\n{raw_text}\n\n"
-                display_text += "🔄 " + "=" * 45 + "\n\n"
-            
-            display_text += f"✨ GPT-4o Analysis:\n{processed_text}"
+        # Кешируем только успешные результаты воркера (не повторно - ответы из кеша)
+        worker = self.sender()
+        if getattr(worker, 'cancelled', False):
+            return  # Результат отмененного воркера может быть неполным
+        cache_key = getattr(worker, 'cache_key', None)
+        if cache_key and raw_text:
+            self.ocr_cache.put(cache_key, raw_text, processed_text, content_type)
+            near_duplicate = getattr(worker, 'near_duplicate', None)
+            if near_duplicate is not None:
+                self.phash_index.add(near_duplicate[0], near_duplicate[1], cache_key)
+        shape_class = getattr(worker, 'shape_class', None)
+        if shape_class is not None and raw_text:
+            self.last_content_types[shape_class] = content_type
+        region_watcher = getattr(worker, 'region_watcher', None)
+        if region_watcher is not None:
+            region_watcher.last_content_type = content_type
+            # Запоминаем строки этого прохода для следующего инкрементального OCR
+            line_blocks = [block for block in (worker.blocks or []) if block.signature is not None]
+            if line_blocks:
+                region_watcher.strip_cache.replace(
+                    [(block.bbox[1], block.signature, block.result) for block in line_blocks])
             
+        if processed_text:
+            display_text = self.format_ocr_result(raw_text, processed_text, content_type)
             self.text_edit.setText(display_text)
             self.add_to_history(display_text, content_type)
             
@@ -2169,6 +4937,10 @@ class OBSCompleteAssistantOptimized(QMainWindow):
             
     @pyqtSlot(str)
     def handle_ocr_error(self, error_msg):
+        # Результат после ошибки (например, без ответа OpenAI) не кешируем
+        worker = self.sender()
+        if worker is not None:
+            worker.cache_key = None
         self.cancel_button.setEnabled(False)
         self.status_widget.hide_progress()
         self.status_widget.show_message(f"OCR Error: {error_msg}", 10)
@@ -2229,9 +5001,7 @@ class OBSCompleteAssistantOptimized(QMainWindow):
             self.logger.info("Text copied to clipboard")
             
     def reset_view(self):
-        self.video_widget.zoom_factor = 1.0
-        self.video_widget.pan_offset = QPointF(0, 0)
-        self.video_widget.selection_rect = QRectF()
+        self.video_widget.reset_view()
         self.copy_button.setEnabled(False)
         self.status_widget.show_message("View reset", 2)
         self.logger.info("View reset")
@@ -2500,6 +5270,7 @@ class OBSCompleteAssistantOptimized(QMainWindow):
         try:
             self.save_history_to_file()
             self.save_settings()
+            self.psm_stats.save()
             self.last_autosave = datetime.now()
             self.logger.debug("Autosave completed")
         except Exception as e:
@@ -2510,6 +5281,7 @@ class OBSCompleteAssistantOptimized(QMainWindow):
         try:
             self.save_history_to_file()
             self.save_settings()
+            self.psm_stats.save()
             self.status_widget.show_message("All data saved successfully", 3)
             self.logger.info("Manual save completed")
         except Exception as e:
@@ -2720,6 +5492,7 @@ class OBSCompleteAssistantOptimized(QMainWindow):
         <li><b>Левая кнопка мыши</b> - Выделить область для OCR</li>
         <li><b>Правая кнопка мыши + перетаскивание</b> - Панорамирование</li>
         <li><b>Колесико мыши</b> - Зум</li>
+        <li><b>📌 Watch Region</b> - Закрепить выделение: OCR повторяется сам, когда область меняется</li>
         </ul>
         """
         
@@ -2770,11 +5543,35 @@ class OBSCompleteAssistantOptimized(QMainWindow):
         dialog = SettingsDialog(self, self.settings)
         if dialog.exec_():
             old_floating = self.settings.get('floating_windows', True)
-            self.settings = dialog.get_settings()
+            old_cache_config = (self.settings.get('ocr_cache_size', 128), self.settings.get('ocr_disk_cache', False))
+            old_screen_area = (self.settings.get('screen_monitor', 1), self.settings.get('screen_region', []))
+            # Настройки без виджетов в диалоге (например, preprocessing_stages) сохраняем
+            self.settings.update(dialog.get_settings())
             self.save_settings()
             self.status_widget.show_message("Settings updated", 3)
             self.logger.info("Settings updated")
             
+            # Прогреваем движки для нового языка OCR
+            self.warm_up_ocr_engines()
+            if not self.settings.get('parallel_psm', False):
+                self.shutdown_ocr_process_pool()
+            if old_cache_config != (self.settings.get('ocr_cache_size', 128), self.settings.get('ocr_disk_cache', False)):
+                self.ocr_cache = self.create_ocr_cache()
+            self.phash_index.max_distance = self.settings.get('phash_max_distance', 10)
+            self.preprocessing_pipeline.close()
+            self.preprocessing_pipeline = self.create_preprocessing_pipeline()
+            self.debug_writer.image_format = self.settings.get('debug_image_format', 'png')
+            self.debug_writer.compression = self.settings.get('debug_image_compression', 1)
+            self.frame_scheduler = self.create_frame_scheduler()
+            if self.capture_worker is not None:
+                self.capture_worker.change_detector = self.create_change_detector()
+            new_screen_area = (self.settings.get('screen_monitor', 1), self.settings.get('screen_region', []))
+            if self.screen_capture_mode and new_screen_area != old_screen_area:
+                self.setup_video_capture(-1)
+            for watcher in self.region_watchers:
+                watcher.change_threshold = self.settings.get('watch_change_threshold', 24)
+                watcher.settle_frames = self.settings.get('watch_settle_frames', 5)
+            
             # Обновляем уровень логирования
             log_level = getattr(logging, self.settings.get('log_level', 'INFO'))
             logging.getLogger().setLevel(log_level)
@@ -2821,16 +5618,22 @@ class OBSCompleteAssistantOptimized(QMainWindow):
             self.audio_window.hide()
         
         # Очистка ресурсов
-        if self.cap:
-            self.cap.release()
+        self.stop_capture()
         self.stop_recording()
         self.cleanup_workers()
+        self.ocr_engine_pool.close()
+        self.shutdown_ocr_process_pool()
+        self.preprocessing_pipeline.close()
+        self.debug_writer.close()
         
         self.logger.info("Application closed")
         event.accept()
 
 
 def main():
+    # Нужно для пула процессов OCR в собранном exe на Windows
+    multiprocessing.freeze_support()
+    
     app = QApplication(sys.argv)
     app.setApplicationName("OBS Complete Assistant Optimized")
     app.setApplicationVersion("3.0")
@@ -38,6 +38,12 @@ setup(
     python_requires=">=3.8",
     install_requires=requirements,
     extras_require={
+        'fast-ocr': [
+            'tesserocr>=2.6',
+        ],
+        'video': [
+            'av>=10.0',
+        ],
         'dev': [
             'pytest>=6.0',
             'black>=21.0',